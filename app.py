@@ -7,16 +7,26 @@ import folium
 from streamlit_folium import folium_static
 import os
 import sys           
-from src.ai_analysis import GeminiAnalyzer
-import requests
 from dotenv import load_dotenv
 import datetime
 from src.ui_components import (
     render_custom_css,
     render_header,
     render_sidebar_controls,
-    render_main_content
+    render_main_content,
+    render_perf_panel,
+    render_chart_zoom
 )
+from src.tracing import span, start_trace, traced
+from config.settings import list_profiles
+from src.result_store import current_session_id, get_result_store, region_key, result_key
+from src.anomaly import get_detector
+from src.aoi import load_geojson, read_aois, region_from_geometry
+from src.tiling import DEFAULT_ZOOM, TiledProcessor
+from src.geocode import fetch_json, google_maps_results
+from shapely.ops import unary_union
+import json
+import tempfile
 from datetime import datetime, timedelta
 import plotly.io as pio
 from fpdf import FPDF
@@ -46,8 +56,7 @@ def geocode_place(place_name):
         "format": "json",
         "limit": 1
     }
-    response = requests.get(url, params=params)
-    results = response.json()
+    results = fetch_json('nominatim', url, params, 'http.nominatim_search')
     if results:
         lat = float(results[0]['lat'])
         lon = float(results[0]['lon'])
@@ -65,63 +74,94 @@ def google_places_autocomplete(input_text):
         "language": "en"
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code != 200:
-            return []
-        data = response.json()
-        if data.get("status") != "OK":
-            return []
-        return data.get("predictions", [])
+        return google_maps_results(url, params, 'http.places_autocomplete', key='predictions')
     except Exception as e:
+        print(f"Error fetching place suggestions: {str(e)}")
         return []
 
 def google_geocode(place_id):
+    """Coordinates and address for a place id; (None, None, None) when Google has no match"""
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {
         "place_id": place_id,
         "key": GOOGLE_API_KEY
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code != 200:
-            return None, None, None
-        data = response.json()
-        if data.get("status") != "OK":
-            return None, None, None
-        results = data.get("results", [])
+        results = google_maps_results(url, params, 'http.geocode')
         if results:
             location = results[0]['geometry']['location']
             display_name = results[0]['formatted_address']
             return location['lat'], location['lng'], display_name
-        else:
-            return None, None, None
-    except Exception as e:
         return None, None, None
+    except Exception as e:
+        print(f"Error geocoding place {place_id}: {str(e)}")
+        raise
 
 def get_place_coordinates(place_id):
     """Get coordinates for a place using Google Places API"""
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {
-        "place_id": place_id,
-        "key": GOOGLE_API_KEY
-    }
     try:
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code != 200:
-            return None, None, None
-        data = response.json()
-        if data.get("status") != "OK":
-            return None, None, None
-        results = data.get("results", [])
-        if results:
-            location = results[0]['geometry']['location']
-            display_name = results[0]['formatted_address']
-            return location['lat'], location['lng'], display_name
-        return None, None, None
+        return google_geocode(place_id)
     except Exception as e:
         st.error(f"Error getting place coordinates: {str(e)}")
         return None, None, None
 
+def load_uploaded_aoi(uploaded_file):
+    """Build a simplified polygon region from an uploaded GeoJSON or zipped shapefile"""
+    name = os.path.splitext(uploaded_file.name)[0]
+    if uploaded_file.name.lower().endswith('.zip'):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, uploaded_file.name)
+            with open(path, 'wb') as f:
+                f.write(uploaded_file.getvalue())
+            aois = read_aois(path)
+        if not aois:
+            raise ValueError("Shapefile contains no polygons")
+        if len(aois) == 1:
+            name, geometry = aois[0]
+        else:
+            # Union the raw polygons and simplify once so the error bound holds for the result
+            geometry = unary_union([geom for _, geom in aois])
+        return region_from_geometry(geometry, name)
+    return load_geojson(json.loads(uploaded_file.getvalue()), name=name)
+
+def compute_analysis(data_fetcher, ndvi_processor, visualizer, start_date, end_date, tiled=False):
+    """Compute stats, series and map for a region; the result is shared between sessions"""
+    # Get the latest image (raises if the collection is empty)
+    collection = data_fetcher.fetch_satellite_data(start_date=start_date, end_date=end_date)
+    latest_image = ee.Image(collection.first())
+    index_image = data_fetcher.calculate_indices(latest_image)
+    ndvi = index_image.select('NDVI')
+    if tiled:
+        # Compose from grid cells so overlapping regions reuse cached cell results
+        zoom = data_fetcher.config.get('tiling', {}).get('zoom', DEFAULT_ZOOM)
+        tiled_processor = TiledProcessor(data_fetcher, zoom=zoom)
+        series, stats = tiled_processor.get_series_and_statistics(start_date, end_date)
+    else:
+        stats = ndvi_processor.get_statistics(index_image)
+        # The series streams in date chunks; show how far it has got
+        status = st.empty()
+        series = ndvi_processor.get_time_series(start_date=start_date, end_date=end_date,
+                                               progress=lambda n: status.caption(f"Fetched {n} scenes..."))
+        status.empty()
+    return {
+        'config': data_fetcher.config,
+        'stats': stats,
+        'series': series,
+        'map': visualizer.create_map(ndvi),
+        'ndvi': ndvi
+    }
+
+def cached_figure(store, analysis_key, kind, session_id, build, **params):
+    """Return a figure for an analysis from the shared store, building it once"""
+    key = f"{analysis_key}:{kind}:{json.dumps(params, sort_keys=True)}"
+    return store.get_or_compute(key, build, owner=session_id)
+
+def cached_forecast(store, analysis_key, session_id, visualizer, series, periods):
+    """Fit the forecast for an analysis once per horizon; zoomed charts re-slice it"""
+    key = f"{analysis_key}:forecast_table:{periods}"
+    return store.get_or_compute(key, lambda: visualizer.forecast(series, periods=periods), owner=session_id)
+
+@traced('create_pdf')
 def create_pdf(region, date_range, ndvi_mean, ndvi_std, map_path, ts_path, forecast_path):
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -158,9 +198,17 @@ def create_pdf(region, date_range, ndvi_mean, ndvi_std, map_path, ts_path, forec
     pdf.multi_cell(0, 10, "This report was generated automatically by the Environmental Monitoring System.")
     return pdf.output(dest='S').encode('latin-1')
 
+def reset_region_selection():
+    """Drop the geocoded place and uploaded AOI so a newly selected profile's region applies"""
+    for key in ('region', 'selected_place', 'selected_place_id', 'aoi_file_id'):
+        st.session_state.pop(key, None)
+    # A new uploader key empties the widget, so the same file can be uploaded and applied again
+    st.session_state['aoi_upload_version'] = st.session_state.get('aoi_upload_version', 0) + 1
+
 def main():
     # Set Streamlit to wide mode for a modern dashboard look
     st.set_page_config(page_title="Environmental Monitoring Dashboard", layout="wide")
+    tracer = start_trace()
 
     # Add custom CSS and header
     render_custom_css()
@@ -169,26 +217,40 @@ def main():
     # Get controls from sidebar
     selected_place, start_date, end_date, forecast_years, process = render_sidebar_controls()
 
-    # Use session state for region, fallback to config if not set
-    if 'region' in st.session_state:
-        region = st.session_state['region']
-    else:
-        import json
-        with open('config/config.json', 'r') as f:
-            config = json.load(f)
-        region = config['region']
-        if 'name' not in region:
-            region['name'] = "Default Region"
+    # Optional named region profile from config.json
+    profiles = list_profiles()
+    profile = None
+    if profiles:
+        choice = st.sidebar.selectbox("Region profile", ["(default)"] + profiles, key="region_profile",
+                                      on_change=reset_region_selection)
+        profile = None if choice == "(default)" else choice
+
+    # Optional polygon AOI upload (GeoJSON or zipped shapefile)
+    aoi_file = st.sidebar.file_uploader("Area of interest (GeoJSON or zipped shapefile)",
+                                        type=["geojson", "json", "zip"],
+                                        key=f"aoi_upload_{st.session_state.get('aoi_upload_version', 0)}")
+    if aoi_file is not None and st.session_state.get('aoi_file_id') != aoi_file.file_id:
+        try:
+            st.session_state['region'] = load_uploaded_aoi(aoi_file)
+            st.session_state['aoi_file_id'] = aoi_file.file_id
+        except Exception as e:
+            st.sidebar.error(f"Could not load AOI: {str(e)}")
+
+    # Use session state for region, fallback to the cached config if not set
+    region = st.session_state.get('region')
 
     # Initialize data handlers
-    data_fetcher = DataFetcher(region=region)
+    data_fetcher = DataFetcher(region=region, profile=profile)
     ndvi_processor = NDVIProcessor(data_fetcher)
     visualizer = Visualizer(data_fetcher)
-    gemini_analyzer = GeminiAnalyzer()
 
-    # Use session state to persist NDVI collection
-    if 'ndvi_collection' not in st.session_state:
-        st.session_state['ndvi_collection'] = None
+    tiled = st.sidebar.checkbox("Grid-tiled caching", key="use_tiling",
+                                value=data_fetcher.config.get('tiling', {}).get('enabled', False),
+                                help="Compute stats and series per grid cell so overlapping regions reuse work")
+
+    # Results live in the process-wide store; the session only keeps their key
+    store = get_result_store()
+    session_id = current_session_id()
 
     if process:
         with st.spinner("Processing data..."):
@@ -206,43 +268,49 @@ def main():
                                 'west': lon - 0.05
                             }
                         }
-                        data_fetcher = DataFetcher(region=st.session_state['region'])
+                        data_fetcher = DataFetcher(region=st.session_state['region'], profile=profile)
                         ndvi_processor = NDVIProcessor(data_fetcher)
                         visualizer = Visualizer(data_fetcher)
 
-                # Get the latest image
-                collection = data_fetcher.fetch_satellite_data(
-                    start_date=start_date.strftime("%Y-%m-%d"),
-                    end_date=end_date.strftime("%Y-%m-%d")
+                start = start_date.strftime("%Y-%m-%d")
+                end = end_date.strftime("%Y-%m-%d")
+                key = result_key('analysis', data_fetcher.config, start_date=start, end_date=end, tiled=tiled)
+                results = store.get_or_compute(
+                    key,
+                    lambda: compute_analysis(data_fetcher, ndvi_processor, visualizer, start, end, tiled),
+                    owner=session_id
                 )
+                st.session_state['result_key'] = key
 
-                if collection.size().getInfo() == 0:
-                    st.error("No satellite images found for the selected region and time period")
-                    return
-
-                latest_image = ee.Image(collection.first())
-                ndvi = data_fetcher.calculate_ndvi(latest_image)
-                st.session_state['latest_ndvi'] = ndvi
-                st.session_state['latest_config'] = data_fetcher.config
-
-                stats = ndvi_processor.get_statistics(ndvi)
-                st.session_state['ndvi_stats'] = stats
-
-                ndvi_collection = ndvi_processor.process_time_series()
-                st.session_state['ndvi_collection'] = ndvi_collection
-
-                m = visualizer.create_map(ndvi)
-                st.session_state['map'] = m
+                # Score scenes not seen before against the region's seasonal baseline
+                detector = get_detector()
+                if detector.update_series(region_key(data_fetcher.config), results['series']):
+                    detector.save()
 
                 # Save your Plotly figures
-                fig_time_series = visualizer.plot_time_series(ndvi_collection)
-                fig_forecast = visualizer.plot_forecast(ndvi_collection, periods=60)
-                fig_time_series.write_image("time_series.png")
-                fig_forecast.write_image("forecast.png")
+                fig_time_series = cached_figure(store, key, 'time_series', session_id,
+                                                lambda: visualizer.plot_time_series(results['series']),
+                                                zoom=None)
+                forecast = cached_forecast(store, key, session_id, visualizer, results['series'], 60)
+                fig_forecast = cached_figure(store, key, 'forecast', session_id,
+                                             lambda: visualizer.plot_forecast(results['series'], periods=60,
+                                                                              forecast=forecast),
+                                             periods=60, zoom=None)
+                with span('kaleido.write_image', path="time_series.png"):
+                    fig_time_series.write_image("time_series.png")
+                with span('kaleido.write_image', path="forecast.png"):
+                    fig_forecast.write_image("forecast.png")
 
             except Exception as e:
                 st.error(f"Error processing data: {str(e)}")
 
+    # Look up this session's results; they may have been evicted from the shared store
+    current_key = st.session_state.get('result_key')
+    results = store.get(current_key) if current_key else None
+    if current_key and results is None:
+        st.info("Cached results for this region have expired. Click 'Process Latest Data' to recompute.")
+        st.session_state['result_key'] = None
+
     # Sidebar: Show configuration
     st.sidebar.header("Current Configuration")
     if 'selected_place' in st.session_state and st.session_state.selected_place:
@@ -250,12 +318,14 @@ def main():
     st.sidebar.json(data_fetcher.config)
 
     # Prepare variables for main content
+    latest_config = results['config'] if results else None
     region_name = (
-        st.session_state['latest_config']['region']['name']
-        if st.session_state.get('latest_config') and st.session_state['latest_config'].get('region') and st.session_state['latest_config']['region'].get('name')
+        latest_config['region']['name']
+        if latest_config and latest_config.get('region') and latest_config['region'].get('name')
         else "N/A"
     )
-    ndvi_stats = st.session_state.get('ndvi_stats')
+    ndvi_stats = results['stats'] if results else None
+    anomaly = get_detector().latest(region_key(latest_config)) if latest_config else None
     # These will be used in the PDF section
     ndvi_mean = ndvi_stats['NDVI_mean'] if ndvi_stats and ndvi_stats.get('NDVI_mean') is not None else "N/A"
     ndvi_std = ndvi_stats['NDVI_stdDev'] if ndvi_stats and ndvi_stats.get('NDVI_stdDev') is not None else "N/A"
@@ -264,23 +334,42 @@ def main():
     forecast_path = "forecast.png"
     date_range = f"{start_date} to {end_date}"
 
+    # Zooming re-slices the cached series at full resolution; charts are downsampled to the view
+    ndvi_series = results['series'] if results else None
+    zoom_range = render_chart_zoom(ndvi_series)
+    zoom_key = [str(v) for v in zoom_range] if zoom_range else None
+
     # Render main content (dashboard style)
     render_main_content(
-        ndvi_map=st.session_state.get('map'),
+        ndvi_map=results['map'] if results else None,
         ndvi_stats=ndvi_stats,
-        time_series_fig=visualizer.plot_time_series(st.session_state.get('ndvi_collection')) if st.session_state.get('ndvi_collection') else None,
-        forecast_fig=visualizer.plot_forecast(st.session_state.get('ndvi_collection'), periods=forecast_years*12) if st.session_state.get('ndvi_collection') else None,
+        time_series_fig=cached_figure(
+            store, current_key, 'time_series', session_id,
+            lambda: visualizer.plot_time_series(ndvi_series, x_range=zoom_range), zoom=zoom_key
+        ) if ndvi_series is not None else None,
+        forecast_fig=cached_figure(
+            store, current_key, 'forecast', session_id,
+            lambda: visualizer.plot_forecast(
+                ndvi_series, periods=forecast_years*12, x_range=zoom_range,
+                forecast=cached_forecast(store, current_key, session_id, visualizer, ndvi_series, forecast_years*12)
+            ),
+            periods=forecast_years*12, zoom=zoom_key
+        ) if ndvi_series is not None else None,
         ai_analysis=st.session_state.get('ai_analysis'),
-        region_name=region_name
+        region_name=region_name,
+        analysis_data=ndvi_series.to_pandas().to_dict('list') if ndvi_series is not None else None,
+        analysis_region=latest_config['region'] if latest_config else None,
+        anomaly=anomaly
     )
 
     # PDF Report Download Section
     st.markdown("---")
     st.markdown("### 📄 Download PDF Report")
     if st.button("Generate PDF Report"):
-        # Save a static map if needed (replace with your actual map saving logic)
-        # fig_map = ... (create or get your map figure)
-        # fig_map.write_image("ndvi_map.png")
+        if results:
+            # Rendered once per analysis and cached, so repeat reports are instant
+            with open(map_path, "wb") as f:
+                f.write(visualizer.create_static_map(results['ndvi'], cache_key=current_key))
         pdf_bytes = create_pdf(region_name, date_range, ndvi_mean, ndvi_std, map_path, ts_path, forecast_path)
         st.download_button(
             label="Download PDF",
@@ -289,5 +378,9 @@ def main():
             mime="application/pdf"
         )
 
+    # Optional per-rerun performance panel
+    if st.sidebar.checkbox("Show performance panel", key="show_perf_panel"):
+        render_perf_panel(tracer)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
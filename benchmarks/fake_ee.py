@@ -0,0 +1,647 @@
+"""
+Deterministic, in-process stand-in for the subset of the Earth Engine API
+used by ``src``. Install it with ``benchmarks.fake_services.install()``.
+
+Scenes are synthesized on a fixed global pixel grid, so the same location
+always yields the same pixel values regardless of the requested region.
+Every ``getInfo`` / ``getMapId`` call counts as one round trip and sleeps
+for the configured latency.
+"""
+import io
+import mmap
+import threading
+import time
+import types
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import shapely
+import shapely.geometry
+
+_settings = {
+    'latency_ms': 0.0,
+    'seed': 0,
+    'revisit_days': 16,
+    'max_side': 2048,
+    'catalog_start': '2013-04-11'
+}
+stats = {'round_trips': 0}
+# Guards stats and the render cache when chunks are fetched from worker threads
+_lock = threading.Lock()
+
+data = types.SimpleNamespace(_initialized=False)
+
+_METERS_PER_DEGREE = 111320.0
+_BASE_BANDS = ('B2', 'B3', 'B4', 'B5', 'B6')
+_SYNTH_BLOCK_ROWS = 64
+
+
+def configure(latency_ms=None, seed=None, revisit_days=None, max_side=None):
+    """Set the simulated round-trip latency and scene generation parameters."""
+    if latency_ms is not None:
+        _settings['latency_ms'] = float(latency_ms)
+    if seed is not None:
+        _settings['seed'] = int(seed)
+    if revisit_days is not None:
+        _settings['revisit_days'] = int(revisit_days)
+    if max_side is not None:
+        _settings['max_side'] = int(max_side)
+
+
+def reset_stats():
+    """Reset the round-trip counter."""
+    stats['round_trips'] = 0
+
+
+def Initialize(*args, **kwargs):
+    data._initialized = True
+
+
+def Authenticate(*args, **kwargs):
+    return True
+
+
+def _round_trip():
+    with _lock:
+        stats['round_trips'] += 1
+    if _settings['latency_ms'] > 0:
+        time.sleep(_settings['latency_ms'] / 1000.0)
+
+
+def _evaluate(value):
+    """Recursively evaluate lazy objects into plain Python values."""
+    if isinstance(value, ComputedObject):
+        return _evaluate(value._evaluate())
+    if isinstance(value, dict):
+        return {k: _evaluate(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_evaluate(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class ComputedObject:
+    def __init__(self, thunk):
+        self._thunk = thunk
+
+    def _evaluate(self):
+        return self._thunk()
+
+    def getInfo(self):
+        _round_trip()
+        return _evaluate(self)
+
+    def get(self, key):
+        return ComputedObject(lambda: _evaluate(self).get(key))
+
+
+class Number(ComputedObject):
+    def __init__(self, value):
+        super().__init__(lambda: _evaluate(value))
+
+
+class String(ComputedObject):
+    def __init__(self, value):
+        super().__init__(lambda: _evaluate(value))
+
+
+class Dictionary(ComputedObject):
+    def __init__(self, value):
+        super().__init__(value if callable(value) else (lambda: _evaluate(value)))
+
+
+class List(ComputedObject):
+    def __init__(self, value):
+        super().__init__(value if callable(value) else (lambda: _evaluate(value)))
+
+
+class Date(ComputedObject):
+    def __init__(self, value):
+        super().__init__(lambda: _to_datetime(_evaluate(value)))
+
+    def millis(self):
+        return Number(lambda: int(self._evaluate().timestamp() * 1000))
+
+    def format(self, fmt='YYYY-MM-dd'):
+        pattern = fmt.replace('YYYY', '%Y').replace('MM', '%m').replace('dd', '%d')
+        return String(ComputedObject(lambda: self._evaluate().strftime(pattern)))
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000.0, tz=timezone.utc)
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+class Geometry(ComputedObject):
+    def __init__(self, geo_json, proj=None, geodesic=None):
+        if isinstance(geo_json, dict):
+            self._shape = shapely.geometry.shape(geo_json)
+        else:
+            self._shape = shapely.geometry.box(*[float(v) for v in geo_json])
+        self.bounds_tuple = tuple(float(v) for v in self._shape.bounds)
+        self._is_box = self._shape.equals(shapely.geometry.box(*self.bounds_tuple))
+        super().__init__(lambda: shapely.geometry.mapping(self._shape))
+
+    @staticmethod
+    def Rectangle(coords, *args, **kwargs):
+        return Geometry(coords)
+
+    @staticmethod
+    def Polygon(coords, *args, **kwargs):
+        return Geometry({'type': 'Polygon', 'coordinates': coords})
+
+    @staticmethod
+    def MultiPolygon(coords, *args, **kwargs):
+        return Geometry({'type': 'MultiPolygon', 'coordinates': coords})
+
+    def bounds(self):
+        return Geometry(self.bounds_tuple)
+
+    def area(self, maxError=None):
+        west, south, east, north = self.bounds_tuple
+        scale = _METERS_PER_DEGREE ** 2 * np.cos(np.radians((north + south) / 2))
+        return Number(ComputedObject(lambda: float(self._shape.area * scale)))
+
+    def contains_mask(self, lon, lat):
+        """Boolean mask of pixel centers that fall inside the geometry."""
+        west, south, east, north = self.bounds_tuple
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        if self._is_box:
+            return inside
+        return inside & shapely.contains_xy(self._shape, lon, lat)
+
+
+def _untraced_empty(shape, dtype):
+    """
+    Array in anonymous mmap memory, which tracemalloc does not see. Pixel
+    grids and scene bands are server-side state, so they must not count
+    toward the client's peak memory in the benchmarks.
+    """
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape))
+    buffer = mmap.mmap(-1, max(size * dtype.itemsize, 1))
+    return np.frombuffer(buffer, dtype=dtype, count=size).reshape(shape)
+
+
+def _untraced(array):
+    copy = _untraced_empty(array.shape, array.dtype)
+    copy[...] = array
+    return copy
+
+
+def _pixel_grid(geometry, scale):
+    """Pixel-center coordinates of the fixed global grid covering the geometry."""
+    return _grid(geometry.bounds_tuple, scale, _settings['max_side'])
+
+
+@lru_cache(maxsize=16)
+def _grid(bounds, scale, max_side):
+    west, south, east, north = bounds
+    step = scale / _METERS_PER_DEGREE
+    cols = np.arange(np.floor(west / step), np.ceil(east / step))
+    rows = np.arange(np.floor(south / step), np.ceil(north / step))
+    if len(cols) > max_side:
+        cols = cols[np.linspace(0, len(cols) - 1, max_side).astype(int)]
+    if len(rows) > max_side:
+        rows = rows[np.linspace(0, len(rows) - 1, max_side).astype(int)]
+    lon, lat = np.meshgrid((cols + 0.5) * step, (rows + 0.5) * step)
+    lon, lat = _untraced(lon), _untraced(lat)
+    lon.flags.writeable = lat.flags.writeable = False
+    return lon, lat
+
+
+def _hash_noise(lon, lat, salt):
+    """Location-stable pseudo-random noise in [0, 1)."""
+    value = np.sin(lon * 12.9898 + lat * 78.233 + salt * 37.719) * 43758.5453
+    return (value - np.floor(value)).astype(np.float32)
+
+
+def _synthesize_scene(index, when, lon, lat):
+    """Generate surface reflectance bands for one synthetic scene."""
+    bands = {name: _untraced_empty(lon.shape, np.float32) for name in _BASE_BANDS}
+    # Row blocks bound the float64 temporaries a render holds at once
+    for start in range(0, lon.shape[0], _SYNTH_BLOCK_ROWS):
+        rows = slice(start, start + _SYNTH_BLOCK_ROWS)
+        for name, values in _synthesize_block(index, when, lon[rows], lat[rows]).items():
+            bands[name][rows] = values
+    return bands
+
+
+def _synthesize_block(index, when, lon, lat):
+    salt = _settings['seed'] * 1000.003 + index * 0.618
+    doy = when.timetuple().tm_yday
+    season = 0.2 * np.sin(2 * np.pi * (doy - 100) / 365.25)
+    field = 0.15 * np.sin(lon * 40.0) * np.cos(lat * 40.0)
+    noise = 0.1 * (_hash_noise(lon, lat, salt) - 0.5)
+    water = (np.sin(lon * 7.0 + lat * 5.0) > 0.93)
+    ndvi = np.clip(0.35 + season + field + noise, -0.2, 0.9).astype(np.float32)
+    ndvi = np.where(water, -0.3, ndvi).astype(np.float32)
+    red = (0.08 + 0.04 * _hash_noise(lon, lat, salt + 1.0)).astype(np.float32)
+    nir = (red * (1 + ndvi) / (1 - ndvi)).astype(np.float32)
+    green = (red * 1.1).astype(np.float32)
+    blue = (red * 0.8).astype(np.float32)
+    swir = np.where(water, 0.02, red * 1.5).astype(np.float32)
+    return {'B2': blue, 'B3': green, 'B4': red, 'B5': nir, 'B6': swir}
+
+
+class Image(ComputedObject):
+    def __init__(self, source=None, render=None, properties=None, bands=None):
+        if isinstance(source, Image):
+            render, properties, bands = source._render, source._properties, source._bands
+        elif isinstance(source, ComputedObject):
+            lazy = source
+            render = lambda geometry, scale: _evaluate_image(lazy)._render(geometry, scale)
+            properties = lambda: _evaluate_image(lazy)._properties()
+            bands = lambda: _evaluate_image(lazy)._bands()
+        elif isinstance(source, (int, float)):
+            constant = float(source)
+            render = lambda geometry, scale: {'constant': np.full(_pixel_grid(geometry, scale)[0].shape, constant, dtype=np.float32)}
+            bands = lambda: ['constant']
+        self._render = render
+        self._properties = properties or (lambda: {})
+        self._bands = bands or (lambda: [])
+        super().__init__(lambda: {'type': 'Image', 'bands': [{'id': b} for b in self._bands()], 'properties': self._properties()})
+
+    @staticmethod
+    def constant(value):
+        return Image(value)
+
+    def _derive(self, fn, bands=None):
+        parent = self
+        return Image(
+            render=lambda geometry, scale: fn(parent._render(geometry, scale)),
+            properties=parent._properties,
+            bands=bands or parent._bands
+        )
+
+    def get(self, prop):
+        return ComputedObject(lambda: self._properties().get(prop))
+
+    def set(self, *args):
+        props = dict(args[0]) if len(args) == 1 else {args[0]: args[1]}
+        parent = self
+        return Image(render=parent._render, bands=parent._bands,
+                     properties=lambda: {**parent._properties(), **_evaluate(props)})
+
+    def bandNames(self):
+        return List(lambda: list(self._bands()))
+
+    def select(self, names, new_names=None):
+        names = [names] if isinstance(names, str) else list(names)
+        new_names = names if new_names is None else list(new_names)
+        return self._derive(lambda b: {new: b[old] for old, new in zip(names, new_names)},
+                            bands=lambda: list(new_names))
+
+    def rename(self, *names):
+        names = list(names[0]) if len(names) == 1 and isinstance(names[0], (list, tuple)) else list(names)
+        return self._derive(lambda b: dict(zip(names, b.values())), bands=lambda: list(names))
+
+    def addBands(self, other, names=None, overwrite=False):
+        other = Image(other)
+        return Image(
+            render=lambda geometry, scale: {**self._render(geometry, scale), **other._render(geometry, scale)},
+            properties=self._properties,
+            bands=lambda: list(dict.fromkeys(list(self._bands()) + list(other._bands())))
+        )
+
+    def normalizedDifference(self, bands):
+        a, b = bands
+
+        def fn(values):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return {'nd': ((values[a] - values[b]) / (values[a] + values[b])).astype(np.float32)}
+        return self._derive(fn, bands=lambda: ['nd'])
+
+    def _binary(self, other, op):
+        other_image = other if isinstance(other, Image) else None
+
+        def render(geometry, scale):
+            left = self._render(geometry, scale)
+            if other_image is not None:
+                right_values = list(other_image._render(geometry, scale).values())
+                right = right_values[0] if len(right_values) == 1 else right_values
+            else:
+                right = other
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if isinstance(right, list):
+                    return {k: op(v, r).astype(np.float32) for (k, v), r in zip(left.items(), right)}
+                return {k: op(v, right).astype(np.float32) for k, v in left.items()}
+        return Image(render=render, properties=self._properties, bands=self._bands)
+
+    def gt(self, other):
+        return self._binary(other, lambda a, b: np.where(np.isnan(a), np.nan, a > b))
+
+    def lt(self, other):
+        return self._binary(other, lambda a, b: np.where(np.isnan(a), np.nan, a < b))
+
+    def And(self, other):
+        return self._binary(other, lambda a, b: np.where(np.isnan(a) | np.isnan(b), np.nan, (a > 0) & (b > 0)))
+
+    def Or(self, other):
+        return self._binary(other, lambda a, b: np.where(np.isnan(a) | np.isnan(b), np.nan, (a > 0) | (b > 0)))
+
+    def add(self, other):
+        return self._binary(other, np.add)
+
+    def subtract(self, other):
+        return self._binary(other, np.subtract)
+
+    def multiply(self, other):
+        return self._binary(other, np.multiply)
+
+    def divide(self, other):
+        return self._binary(other, np.divide)
+
+    def updateMask(self, mask):
+        mask = Image(mask)
+
+        def render(geometry, scale):
+            values = self._render(geometry, scale)
+            masks = list(mask._render(geometry, scale).values())
+            out = {}
+            for i, (k, v) in enumerate(values.items()):
+                m = masks[min(i, len(masks) - 1)]
+                out[k] = np.where((m > 0) & ~np.isnan(m), v, np.nan).astype(np.float32)
+            return out
+        return Image(render=render, properties=self._properties, bands=self._bands)
+
+    def clip(self, geometry):
+        return self
+
+    def _reduce(self, reducer, geometry, scale, band_prefix=True):
+        lon, lat = _pixel_grid(geometry, scale)
+        inside = geometry.contains_mask(lon, lat)
+        bands = self._render(geometry, scale)
+        result = {}
+        for band, values in bands.items():
+            valid = values[inside & ~np.isnan(values)]
+            if band_prefix or len(bands) > 1:
+                result.update(reducer._apply(band, valid))
+            else:
+                result.update({name: fn(valid) for name, fn in reducer._outputs})
+        return result
+
+    def reduceRegion(self, reducer, geometry=None, scale=30, maxPixels=1e9, **kwargs):
+        return Dictionary(lambda: self._reduce(reducer, geometry, scale))
+
+    def reduceRegions(self, collection, reducer, scale=30, **kwargs):
+        # Like Earth Engine, a single-band image's properties are named after the reducer outputs only
+        parent = collection._elements
+        return FeatureCollection(lambda: [
+            Feature(f._geometry, {**f._feature_properties,
+                                  **self._reduce(reducer, f._geometry, scale, band_prefix=False)})
+            for f in parent()
+        ])
+
+    def getMapId(self, vis_params=None):
+        _round_trip()
+        return {
+            'mapid': 'fake-map',
+            'token': '',
+            'tile_fetcher': types.SimpleNamespace(url_format='https://example.invalid/fake/{z}/{x}/{y}')
+        }
+
+    def getThumbURL(self, params=None):
+        _round_trip()
+        with _lock:
+            token = f"thumb-{len(_thumbnails)}"
+            _thumbnails[token] = (self, dict(params or {}))
+        return f'https://example.invalid/fake/thumbnails/{token}.png'
+
+
+_thumbnails = {}
+
+
+def render_thumbnail(url):
+    """
+    PNG bytes for a URL returned by getThumbURL. Like Earth Engine, a
+    single-band image without a palette is stretched from min..max to
+    8-bit gray, with masked pixels transparent.
+    """
+    token = url.rsplit('/', 1)[-1].split('.')[0]
+    image, params = _thumbnails[token]
+    region = params.get('region')
+    if not isinstance(region, Geometry):
+        region = Geometry(region)
+    west, south, east, north = region.bounds_tuple
+    dimensions = int(params.get('dimensions', 512))
+    scale = max(east - west, north - south) * _METERS_PER_DEGREE / dimensions
+    values = next(iter(image._render(region, scale).values()))[::-1]
+    vmin, vmax = float(params.get('min', 0)), float(params.get('max', 1))
+    gray = np.clip((np.nan_to_num(values, nan=vmin) - vmin) / (vmax - vmin) * 255, 0, 255).astype(np.uint8)
+    alpha = np.where(np.isnan(values), 0, 255).astype(np.uint8)
+
+    from PIL import Image as PILImage
+    buffer = io.BytesIO()
+    PILImage.fromarray(np.dstack([gray, alpha])).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _evaluate_image(value):
+    while isinstance(value, ComputedObject) and not isinstance(value, Image):
+        value = value._evaluate()
+    return value
+
+
+class Reducer:
+    def __init__(self, outputs):
+        self._outputs = outputs
+
+    def _apply(self, band, values):
+        if len(self._outputs) == 1:
+            name, fn = self._outputs[0]
+            return {band: fn(values)}
+        return {f"{band}_{name}": fn(values) for name, fn in self._outputs}
+
+    def combine(self, reducer2, outputPrefix='', sharedInputs=False):
+        return Reducer(self._outputs + [(outputPrefix + n, f) for n, f in reducer2._outputs])
+
+    @staticmethod
+    def mean():
+        return Reducer([('mean', lambda v: float(np.mean(v, dtype=np.float64)) if v.size else None)])
+
+    @staticmethod
+    def stdDev():
+        return Reducer([('stdDev', lambda v: float(np.std(v, dtype=np.float64)) if v.size else None)])
+
+    @staticmethod
+    def count():
+        return Reducer([('count', lambda v: int(v.size))])
+
+    @staticmethod
+    def minMax():
+        return Reducer([('min', lambda v: float(np.min(v)) if v.size else None),
+                        ('max', lambda v: float(np.max(v)) if v.size else None)])
+
+
+class Filter:
+    def __init__(self, predicate):
+        self._predicate = predicate
+
+    @staticmethod
+    def lt(name, value):
+        return Filter(lambda props: props.get(name) is not None and props.get(name) < value)
+
+    @staticmethod
+    def gt(name, value):
+        return Filter(lambda props: props.get(name) is not None and props.get(name) > value)
+
+
+class Feature(ComputedObject):
+    def __init__(self, geometry, properties=None):
+        self._geometry = geometry
+        self._feature_properties = properties or {}
+        super().__init__(lambda: {
+            'type': 'Feature',
+            'geometry': _evaluate(geometry),
+            'properties': _evaluate(self._feature_properties)
+        })
+
+    def get(self, key):
+        return ComputedObject(lambda: _evaluate(self._feature_properties.get(key)))
+
+    def set(self, *args):
+        props = dict(args[0]) if len(args) == 1 else {args[0]: args[1]}
+        return Feature(self._geometry, {**self._feature_properties, **props})
+
+
+class ImageCollection(ComputedObject):
+    def __init__(self, source, _elements=None):
+        self._source = source
+        self._elements = _elements or (lambda: _catalog(source))
+        super().__init__(lambda: {
+            'type': 'ImageCollection',
+            'id': source,
+            'features': [_evaluate(e) for e in self._elements()]
+        })
+
+    def _with(self, elements):
+        return ImageCollection(self._source, _elements=elements)
+
+    def filterBounds(self, geometry):
+        return self
+
+    def filterDate(self, start, end=None):
+        start_ms = _to_datetime(_evaluate(start)).timestamp() * 1000
+        end_ms = _to_datetime(_evaluate(end)).timestamp() * 1000 if end is not None else float('inf')
+        parent = self._elements
+        return self._with(lambda: [
+            e for e in parent()
+            if start_ms <= e._properties()['system:time_start'] < end_ms
+        ])
+
+    def filter(self, flt):
+        parent = self._elements
+        return self._with(lambda: [e for e in parent() if flt._predicate(e._properties())])
+
+    def sort(self, prop, ascending=True):
+        parent = self._elements
+        return self._with(lambda: sorted(parent(), key=lambda e: e._properties().get(prop), reverse=not ascending))
+
+    def limit(self, count, prop=None, ascending=True):
+        parent = self.sort(prop, ascending)._elements if prop else self._elements
+        return self._with(lambda: parent()[:count])
+
+    def size(self):
+        return Number(ComputedObject(lambda: len(self._elements())))
+
+    def first(self):
+        return Image(ComputedObject(lambda: self._elements()[0]))
+
+    def toList(self, count, offset=0):
+        return List(lambda: self._elements()[offset:offset + count])
+
+    def aggregate_array(self, prop):
+        return List(lambda: [e._properties().get(prop) for e in self._elements()])
+
+    def map(self, fn):
+        parent = self._elements
+        return FeatureCollection(lambda: [fn(e) for e in parent()])
+
+
+class FeatureCollection(ComputedObject):
+    def __init__(self, elements):
+        self._elements = elements if callable(elements) else (lambda: list(elements))
+        super().__init__(lambda: {
+            'type': 'FeatureCollection',
+            'columns': {},
+            'features': [
+                {**_evaluate(e), 'id': str(i)} for i, e in enumerate(self._elements())
+            ]
+        })
+
+    def size(self):
+        return Number(ComputedObject(lambda: len(self._elements())))
+
+    def toList(self, count, offset=0):
+        return List(lambda: self._elements()[offset:offset + count])
+
+    def map(self, fn):
+        parent = self._elements
+        return FeatureCollection(lambda: [fn(e) for e in parent()])
+
+    def flatten(self):
+        parent = self._elements
+        return FeatureCollection(lambda: [f for fc in parent() for f in fc._elements()])
+
+
+_catalog_cache = {}
+
+
+def _catalog(collection_id):
+    """Synthetic scene list for a catalog id, one scene per revisit interval."""
+    key = (collection_id, _settings['seed'], _settings['revisit_days'])
+    if key not in _catalog_cache:
+        start = datetime.strptime(_settings['catalog_start'], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        end = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        rng = np.random.default_rng(_settings['seed'])
+        scenes = []
+        index = 0
+        when = start
+        while when < end:
+            scenes.append(_scene_image(collection_id, index, when, float(rng.uniform(0, 60))))
+            index += 1
+            when = when + timedelta(days=_settings['revisit_days'])
+        _catalog_cache.setdefault(key, scenes)
+    return _catalog_cache[key]
+
+
+_render_cache = OrderedDict()
+_RENDER_CACHE_SIZE = 8
+
+
+def _render_scene(index, when, geometry, scale):
+    """Synthesize a scene, reusing recent renders so band selections in one graph stay cheap."""
+    key = (_settings['seed'], index, geometry.bounds_tuple, scale)
+    with _lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+    lon, lat = _pixel_grid(geometry, scale)
+    bands = _synthesize_scene(index, when, lon, lat)
+    with _lock:
+        _render_cache[key] = bands
+        if len(_render_cache) > _RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return bands
+
+
+def _scene_image(collection_id, index, when, cloud_cover):
+    props = {
+        'system:index': f"{index:05d}",
+        'system:time_start': int(when.timestamp() * 1000),
+        'CLOUD_COVER': cloud_cover,
+        'SPACECRAFT_ID': collection_id
+    }
+
+    def render(geometry, scale):
+        return _render_scene(index, when, geometry, scale)
+    return Image(render=render, properties=lambda: props, bands=lambda: list(_BASE_BANDS))
@@ -0,0 +1,113 @@
+"""
+Local stand-ins for Earth Engine, Google Places/Geocoding, Nominatim and
+Gemini so the pipeline can be exercised offline and reproducibly.
+"""
+import json
+import sys
+import time
+import types
+
+from benchmarks import fake_ee
+
+_latency = {'ee': 0.0, 'http': 0.0, 'gemini': 0.0}
+_original_requests_get = None
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, content=None):
+        self.status_code = status_code
+        self.content = content if content is not None else json.dumps(payload).encode('utf-8')
+        self._payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} error", response=self)
+
+    def json(self):
+        return self._payload
+
+
+def _sleep(service):
+    if _latency[service] > 0:
+        time.sleep(_latency[service] / 1000.0)
+
+
+def fake_requests_get(url, params=None, **kwargs):
+    """Answer the Places, Geocoding and Nominatim endpoints with canned data."""
+    _sleep('http')
+    params = params or {}
+    if 'place/autocomplete' in url:
+        text = params.get('input', '')
+        return FakeResponse({
+            'status': 'OK',
+            'predictions': [
+                {'description': f"{text} {i}, Fake Country", 'place_id': f"fake-{text}-{i}"}
+                for i in range(5)
+            ]
+        })
+    if 'geocode' in url:
+        return FakeResponse({
+            'status': 'OK',
+            'results': [{
+                'geometry': {'location': {'lat': 26.915, 'lng': 75.825}},
+                'formatted_address': f"Fake place {params.get('place_id', '')}"
+            }]
+        })
+    if 'fake/thumbnails/' in url:
+        return FakeResponse(None, content=fake_ee.render_thumbnail(url))
+    if 'nominatim' in url:
+        return FakeResponse([{'lat': '26.915', 'lon': '75.825', 'display_name': params.get('q', '')}])
+    return FakeResponse({'status': 'NOT_FOUND'}, status_code=404)
+
+
+class _FakeGenerativeModel:
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, **kwargs):
+        _sleep('gemini')
+        return types.SimpleNamespace(text=f"[{self.model_name}] analysis of {len(prompt)} prompt characters.")
+
+
+def _fake_genai_module():
+    module = types.ModuleType('google.generativeai')
+    module.configure = lambda **kwargs: None
+    module.GenerativeModel = _FakeGenerativeModel
+    return module
+
+
+def install(ee_latency_ms=0.0, http_latency_ms=0.0, gemini_latency_ms=0.0, seed=0):
+    """Route ee, google.generativeai and requests.get to the local fakes.
+
+    Must be called before any ``src`` module is imported.
+    """
+    global _original_requests_get
+    _latency.update({'ee': ee_latency_ms, 'http': http_latency_ms, 'gemini': gemini_latency_ms})
+    fake_ee.configure(latency_ms=ee_latency_ms, seed=seed)
+    sys.modules['ee'] = fake_ee
+
+    genai = _fake_genai_module()
+    if 'google' not in sys.modules:
+        try:
+            import google
+        except ImportError:
+            sys.modules['google'] = types.ModuleType('google')
+    sys.modules['google'].generativeai = genai
+    sys.modules['google.generativeai'] = genai
+
+    import requests
+    if _original_requests_get is None:
+        _original_requests_get = requests.get
+    requests.get = fake_requests_get
+
+
+def set_latency(ee_ms=None, http_ms=None, gemini_ms=None):
+    """Change simulated latencies after installation."""
+    if ee_ms is not None:
+        _latency['ee'] = ee_ms
+        fake_ee.configure(latency_ms=ee_ms)
+    if http_ms is not None:
+        _latency['http'] = http_ms
+    if gemini_ms is not None:
+        _latency['gemini'] = gemini_ms
@@ -0,0 +1,90 @@
+"""
+Benchmark for src.forecasting.forecast_batch.
+
+Generates synthetic NDVI series and times batch forecasting for several
+series counts and worker counts. 'aligned' series share one set of dates,
+so they are fitted in a single vectorized solve. 'ragged' series each have
+their own dates and are spread over the process pool.
+
+    python -m benchmarks.forecast_benchmark
+    python -m benchmarks.forecast_benchmark --series 1000 --jobs 1,2,4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_series(count, layout, years=5, revisit_days=16, seed=0):
+    """{id: (dates, values)} with a trend, yearly cycle and noise per series."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-05-01', 'D')
+    base_days = np.arange(0, years * 365, revisit_days)
+    series = {}
+    for i in range(count):
+        days = base_days
+        if layout == 'ragged':
+            # Different revisit offsets and cloud gaps per site
+            days = base_days + int(rng.integers(0, revisit_days))
+            days = days[rng.random(len(days)) > 0.2]
+        t = days / 365.25
+        values = (0.3 + 0.02 * rng.standard_normal() * t
+                  + 0.15 * np.sin(2 * np.pi * t + rng.uniform(0, 2 * np.pi))
+                  + 0.03 * rng.standard_normal(len(days)))
+        series[f"site-{i}"] = ((start + days.astype('timedelta64[D]')).astype('datetime64[ns]'), values)
+    return series
+
+
+def run(counts, layouts, jobs, periods, repeat):
+    from src.forecasting import forecast_batch
+
+    results = []
+    for layout in layouts:
+        for count in counts:
+            series = make_series(count, layout)
+            for n_jobs in jobs:
+                timings = []
+                rows = 0
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    table = forecast_batch(series, periods=periods, n_jobs=n_jobs)
+                    timings.append(time.perf_counter() - started)
+                    rows = len(table)
+                wall = statistics.median(timings)
+                results.append({'layout': layout, 'series': count, 'jobs': n_jobs,
+                                'wall_s': wall, 'series_per_s': count / wall, 'rows': rows})
+    return results
+
+
+def print_results(results):
+    print(f"{'layout':<8} {'series':>7} {'jobs':>5} {'wall s':>9} {'series/s':>11} {'rows':>10}")
+    for r in results:
+        print(f"{r['layout']:<8} {r['series']:>7} {r['jobs']:>5} {r['wall_s']:>9.3f} "
+              f"{r['series_per_s']:>11.0f} {r['rows']:>10}")
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Batch forecasting benchmark")
+    parser.add_argument('--series', default='1000,10000', help="Comma-separated series counts")
+    parser.add_argument('--layouts', default='aligned,ragged', help="Comma-separated date layouts")
+    parser.add_argument('--jobs', default=','.join(sorted({'1', str(cores)}, key=int)),
+                        help="Comma-separated worker counts")
+    parser.add_argument('--periods', type=int, default=60, help="Months to forecast")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per scenario (median is reported)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, REPO_ROOT)
+    results = run([int(c) for c in args.series.split(',')], args.layouts.split(','),
+                  [int(j) for j in args.jobs.split(',')], args.periods, args.repeat)
+    print_results(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
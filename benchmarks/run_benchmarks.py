@@ -0,0 +1,266 @@
+"""
+Offline benchmark suite for the NDVI pipeline.
+
+Runs every stage against the local fakes in ``benchmarks.fake_services`` for
+a matrix of region sizes and date spans, and compares the results with the
+stored baselines.
+
+    python -m benchmarks.run_benchmarks                    # run and compare
+    python -m benchmarks.run_benchmarks --update-baseline  # record new baselines
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'baselines.json')
+
+# Half-width of the region box in degrees; 'medium' matches the ±0.05° box built in app.main()
+REGION_SIZES = {'small': 0.01, 'medium': 0.05, 'large': 0.25}
+DATE_SPANS = {'1y': 365, '5y': 5 * 365}
+CENTER = (26.915, 75.825)
+END_DATE = '2025-05-01'
+STAGES = ['geocode', 'fetch_satellite_data', 'get_statistics', 'process_time_series', 'forecast',
+          'gemini_analysis', 'static_map', 'create_pdf']
+
+
+def _region(size):
+    half = REGION_SIZES[size]
+    lat, lon = CENTER
+    return {
+        'name': f"Benchmark {size}",
+        'coordinates': {
+            'north': lat + half,
+            'south': lat - half,
+            'east': lon + half,
+            'west': lon - half
+        }
+    }
+
+
+def _date_range(span):
+    end = datetime.strptime(END_DATE, '%Y-%m-%d')
+    start = end - timedelta(days=DATE_SPANS[span])
+    return start.strftime('%Y-%m-%d'), END_DATE
+
+
+def _run_pipeline(region_size, span):
+    """Run each stage once and return ({stage: wall_ms}, scene count)."""
+    import ee
+    from app import create_pdf, get_place_coordinates
+    from src.ai_analysis import GeminiAnalyzer
+    from src.data_fetcher import DataFetcher
+    from src.ndvi_processor import NDVIProcessor
+    from src.visualization import Visualizer
+
+    start_date, end_date = _date_range(span)
+    timings = {}
+
+    def timed(stage, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings[stage] = (time.perf_counter() - start) * 1000
+        return result
+
+    timed('geocode', lambda: get_place_coordinates('fake-place'))
+    data_fetcher = DataFetcher(region=_region(region_size))
+    data_fetcher.config['date_range'] = {'start_date': start_date, 'end_date': end_date}
+    ndvi_processor = NDVIProcessor(data_fetcher)
+    visualizer = Visualizer(data_fetcher)
+
+    collection = timed('fetch_satellite_data',
+                       lambda: data_fetcher.fetch_satellite_data(start_date=start_date, end_date=end_date))
+    index_image = data_fetcher.calculate_indices(ee.Image(collection.first()))
+    stats = timed('get_statistics', lambda: ndvi_processor.get_statistics(index_image))
+
+    series = timed('process_time_series', ndvi_processor.get_time_series)
+    timed('forecast', lambda: visualizer.plot_forecast(series, periods=60))
+    timed('gemini_analysis', lambda: GeminiAnalyzer().analyze_ndvi_trend(
+        series.to_pandas().to_dict('list'), data_fetcher.config['region']))
+    map_png = timed('static_map', lambda: visualizer.create_static_map(index_image.select('NDVI')))
+    map_path = os.path.join(tempfile.mkdtemp(prefix='ndvi-bench-'), 'ndvi_map.png')
+    with open(map_path, 'wb') as f:
+        f.write(map_png)
+    timed('create_pdf', lambda: create_pdf(
+        data_fetcher.config['region']['name'], f"{start_date} to {end_date}",
+        stats['NDVI_mean'], stats['NDVI_stdDev'],
+        map_path,
+        os.path.join(REPO_ROOT, 'time_series.png'),
+        os.path.join(REPO_ROOT, 'forecast.png')
+    ))
+    return timings, len(series)
+
+
+def _measure_memory(region_size, span):
+    """Peak traced allocation for one full pipeline run, in KiB."""
+    tracemalloc.start()
+    try:
+        _run_pipeline(region_size, span)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def _quiet_fit_logs():
+    """
+    Keep Prophet's per-fit INFO lines out of the results table. cmdstanpy
+    attaches its INFO handler and resets the level on the first fit unless
+    the logger already has a handler, so install one up front.
+    """
+    import src.visualization
+    for name in ('cmdstanpy', 'prophet'):
+        logger = logging.getLogger(name)
+        if not logger.handlers:
+            logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.WARNING)
+        for handler in logger.handlers:
+            handler.setLevel(logging.WARNING)
+
+
+def run_suite(regions, spans, repeat, warmup=1):
+    """
+    Run the benchmark matrix and return results keyed by 'region/span/stage'.
+    Each scenario first runs `warmup` untimed times so lazy imports and
+    first-use setup do not land in the measurements.
+    """
+    from benchmarks import fake_ee
+
+    results = {}
+    for region_size in regions:
+        for span in spans:
+            runs = []
+            scenes = 0
+            round_trips = 0
+            for _ in range(warmup):
+                _run_pipeline(region_size, span)
+            for _ in range(repeat):
+                fake_ee.reset_stats()
+                timings, scenes = _run_pipeline(region_size, span)
+                round_trips = fake_ee.stats['round_trips']
+                runs.append(timings)
+            peak_kb = _measure_memory(region_size, span)
+
+            prefix = f"{region_size}/{span}"
+            for stage in STAGES:
+                results[f"{prefix}/{stage}"] = {
+                    'wall_ms': statistics.median(r[stage] for r in runs)
+                }
+            total = statistics.median(sum(r.values()) for r in runs)
+            series_ms = results[f"{prefix}/process_time_series"]['wall_ms']
+            results[f"{prefix}/end_to_end"] = {
+                'wall_ms': total,
+                'peak_kb': peak_kb,
+                'scenes': scenes,
+                'round_trips': round_trips,
+                'scenes_per_s': scenes / (series_ms / 1000) if series_ms else None
+            }
+    return results
+
+
+def compare(results, baseline, tolerance, slack_ms=5.0):
+    """Return human-readable regression messages for results worse than the baseline."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        limit = base['wall_ms'] * (1 + tolerance) + slack_ms
+        if result['wall_ms'] > limit:
+            regressions.append(f"{key}: {result['wall_ms']:.1f} ms > {base['wall_ms']:.1f} ms baseline")
+        if base.get('peak_kb') and result.get('peak_kb', 0) > base['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{key}: peak {result['peak_kb']:.0f} KiB > {base['peak_kb']:.0f} KiB baseline")
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'benchmark':<40}{'wall ms':>12}{'baseline':>12}{'peak KiB':>12}{'scenes/s':>12}")
+    for key, result in results.items():
+        base = baseline.get(key, {}).get('wall_ms')
+        peak = result.get('peak_kb')
+        rate = result.get('scenes_per_s')
+        print(f"{key:<40}{result['wall_ms']:>12.1f}"
+              f"{(f'{base:.1f}' if base is not None else '-'):>12}"
+              f"{(f'{peak:.0f}' if peak is not None else ''):>12}"
+              f"{(f'{rate:.1f}' if rate is not None else ''):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline NDVI pipeline benchmarks")
+    parser.add_argument('--regions', default=','.join(REGION_SIZES), help="Comma-separated region sizes")
+    parser.add_argument('--spans', default=','.join(DATE_SPANS), help="Comma-separated date spans")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per scenario (median is reported)")
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed runs per scenario before measuring")
+    parser.add_argument('--ee-latency-ms', type=float, default=20.0, help="Simulated Earth Engine round trip")
+    parser.add_argument('--http-latency-ms', type=float, default=20.0, help="Simulated Places/geocode latency")
+    parser.add_argument('--gemini-latency-ms', type=float, default=200.0, help="Simulated Gemini latency")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic scene seed")
+    parser.add_argument('--max-side', type=int, default=512,
+                        help="Cap on synthetic scene width/height in pixels; bounds fake server cost")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before flagging")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with this run")
+    parser.add_argument('--output', help="Write raw results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+
+    from benchmarks import fake_services
+    fake_services.install(
+        ee_latency_ms=args.ee_latency_ms,
+        http_latency_ms=args.http_latency_ms,
+        gemini_latency_ms=args.gemini_latency_ms,
+        seed=args.seed
+    )
+    from benchmarks import fake_ee
+    fake_ee.configure(max_side=args.max_side)
+    _quiet_fit_logs()
+
+    results = run_suite(args.regions.split(','), args.spans.split(','), args.repeat, args.warmup)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'settings': {
+                    'ee_latency_ms': args.ee_latency_ms,
+                    'http_latency_ms': args.http_latency_ms,
+                    'gemini_latency_ms': args.gemini_latency_ms,
+                    'seed': args.seed,
+                    'max_side': args.max_side,
+                    'repeat': args.repeat,
+                    'warmup': args.warmup
+                },
+                'results': results
+            }, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
+import threading
+
 import google.generativeai as genai
 from config.settings import load_config
+from src.governor import get_governor
+from src.tracing import payload_size, span
 
 class GeminiAnalyzer:
     def __init__(self):
-        config = load_config()
-        self.api_key = config.get('gemini', {}).get('api_key')
+        config = load_config().get('gemini', {})
+        self.api_key = config.get('api_key')
         if not self.api_key:
             raise ValueError("Gemini API key not found in configuration")
         
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model = genai.GenerativeModel(config.get('model', 'gemini-1.5-flash'))
     
     def analyze_ndvi_trend(self, ndvi_data, location_info):
         """
@@ -36,7 +40,9 @@ class GeminiAnalyzer:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            with span('gemini.generate_content', method='analyze_ndvi_trend', bytes=payload_size(prompt)) as record:
+                response = get_governor('gemini').call(self.model.generate_content, prompt)
+                record['attrs']['response_bytes'] = payload_size(response.text)
             return {
                 'analysis': response.text,
                 'status': 'success'
@@ -72,7 +78,9 @@ class GeminiAnalyzer:
         """
         
         try:
-            response = self.model.generate_content(prompt)
+            with span('gemini.generate_content', method='generate_insights', bytes=payload_size(prompt)) as record:
+                response = get_governor('gemini').call(self.model.generate_content, prompt)
+                record['attrs']['response_bytes'] = payload_size(response.text)
             return {
                 'insights': response.text,
                 'status': 'success'
@@ -82,3 +90,16 @@ class GeminiAnalyzer:
                 'insights': f"Error generating insights: {str(e)}",
                 'status': 'error'
             }
+
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer():
+    """Return the process-wide GeminiAnalyzer, shared by all sessions."""
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            _analyzer = GeminiAnalyzer()
+        return _analyzer
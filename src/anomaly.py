@@ -0,0 +1,221 @@
+"""
+Online anomaly detection for new index observations.
+
+Each region keeps a seasonal baseline (an exponentially weighted mean and
+variance per day-of-year bin) plus running residual statistics. A new
+observation is scored against its bin in O(1) and then folded into the
+baseline, so alerts need neither a refit nor a pass over history. State is
+a small JSON file that persists between runs.
+"""
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from src.tracing import get_tracer
+
+DEFAULT_STATE_PATH = os.environ.get("ANOMALY_STATE_PATH", "anomaly_state.json")
+DEFAULT_BINS = 24
+DEFAULT_THRESHOLD = 3.0
+# Observations a bin needs before its own variance is used; until then only
+# the region-wide residual variance scales the score
+DEFAULT_MIN_COUNT = 3
+# Floor on the EW weight so the baseline keeps adapting after many years
+DEFAULT_ALPHA = 0.1
+
+
+class RegionBaseline:
+    __slots__ = ('count', 'mean', 'var', 'resid_count', 'resid_mean', 'resid_var', 'last_date', 'latest')
+
+    def __init__(self, n_bins):
+        """Seasonal baseline and residual statistics for one region."""
+        self.count = np.zeros(n_bins, dtype=np.int64)
+        self.mean = np.zeros(n_bins)
+        self.var = np.zeros(n_bins)
+        self.resid_count = 0
+        self.resid_mean = 0.0
+        self.resid_var = 0.0
+        self.last_date = None
+        self.latest = None
+
+    def to_dict(self):
+        return {
+            'count': self.count.tolist(),
+            'mean': self.mean.tolist(),
+            'var': self.var.tolist(),
+            'resid_count': self.resid_count,
+            'resid_mean': self.resid_mean,
+            'resid_var': self.resid_var,
+            'last_date': self.last_date,
+            'latest': self.latest
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        baseline = cls(len(data['count']))
+        baseline.count = np.asarray(data['count'], dtype=np.int64)
+        baseline.mean = np.asarray(data['mean'], dtype=np.float64)
+        baseline.var = np.asarray(data['var'], dtype=np.float64)
+        baseline.resid_count = data['resid_count']
+        baseline.resid_mean = data['resid_mean']
+        baseline.resid_var = data['resid_var']
+        baseline.last_date = data.get('last_date')
+        baseline.latest = data.get('latest')
+        return baseline
+
+
+def _ew_update(count, mean, var, value, alpha_min):
+    """One step of an exponentially weighted mean/variance; a plain running mean until 1/count < alpha_min."""
+    alpha = max(1.0 / count, alpha_min)
+    delta = value - mean
+    mean = mean + alpha * delta
+    var = (1 - alpha) * (var + alpha * delta * delta)
+    return mean, var
+
+
+class AnomalyDetector:
+    def __init__(self, path=DEFAULT_STATE_PATH, n_bins=DEFAULT_BINS, threshold=DEFAULT_THRESHOLD,
+                 min_count=DEFAULT_MIN_COUNT, alpha=DEFAULT_ALPHA):
+        """Score new observations against per-region seasonal baselines stored at `path`."""
+        self.path = path
+        self.n_bins = n_bins
+        self.threshold = threshold
+        self.min_count = min_count
+        self.alpha = alpha
+        self.regions = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _bin(self, date):
+        day_of_year = (date - date.astype('datetime64[Y]')).astype('timedelta64[D]').astype(int)
+        return min(int(day_of_year * self.n_bins / 366), self.n_bins - 1)
+
+    def score(self, region_key, date, value):
+        """Score an observation without updating state. Negative scores are drops below the baseline."""
+        baseline = self.regions.get(region_key)
+        if baseline is None:
+            return None, None
+        b = self._bin(np.datetime64(date, 'D'))
+        if baseline.count[b] == 0:
+            return None, None
+        # A bin's variance from a few samples can be near zero, so never
+        # score against less than the region-wide residual variance
+        variance = baseline.resid_var if baseline.resid_count >= self.min_count else 0.0
+        if baseline.count[b] >= self.min_count:
+            variance = max(variance, baseline.var[b])
+        if variance <= 0:
+            return float(baseline.mean[b]), None
+        scale = np.sqrt(variance)
+        return float(baseline.mean[b]), float((value - baseline.mean[b]) / scale)
+
+    def update(self, region_key, date, value):
+        """
+        Score one observation and fold it into the baseline. Observations not
+        newer than the last one seen for the region are ignored (returns None),
+        so re-feeding a whole series only processes new scenes.
+        """
+        if value is None or np.isnan(value):
+            return None
+        date = np.datetime64(date, 'D')
+        with self._lock:
+            baseline = self.regions.get(region_key)
+            if baseline is None:
+                baseline = self.regions[region_key] = RegionBaseline(self.n_bins)
+            if baseline.last_date is not None and date <= np.datetime64(baseline.last_date, 'D'):
+                return None
+
+            expected, score = self.score(region_key, date, value)
+            anomaly = score is not None and score <= -self.threshold
+
+            b = self._bin(date)
+            # Anomalous drops are reported but kept out of the baseline and the
+            # residual scale, so a lasting disturbance keeps being flagged
+            # instead of teaching the detector that it is normal
+            if not anomaly:
+                if expected is not None:
+                    baseline.resid_count += 1
+                    baseline.resid_mean, baseline.resid_var = _ew_update(
+                        baseline.resid_count, baseline.resid_mean, baseline.resid_var, value - expected, self.alpha)
+                baseline.count[b] += 1
+                baseline.mean[b], baseline.var[b] = _ew_update(
+                    baseline.count[b], baseline.mean[b], baseline.var[b], value, self.alpha)
+            baseline.last_date = str(date)
+
+            result = {
+                'date': str(date),
+                'value': float(value),
+                'expected': expected,
+                'score': score,
+                'anomaly': bool(anomaly)
+            }
+            baseline.latest = result
+            if anomaly:
+                get_tracer().count('anomaly.flagged')
+            return result
+
+    def update_series(self, region_key, series, index='NDVI'):
+        """Feed an NDVISeries in date order; returns results for the observations that were new."""
+        try:
+            results = []
+            for date, value in zip(series.dates, series.values[index]):
+                result = self.update(region_key, date, float(value))
+                if result is not None:
+                    results.append(result)
+            return results
+        except Exception as e:
+            print(f"Error updating anomaly baseline: {str(e)}")
+            raise
+
+    def latest(self, region_key):
+        """Result for the most recent observation of a region, or None."""
+        baseline = self.regions.get(region_key)
+        return baseline.latest if baseline else None
+
+    def save(self, path=None):
+        """Write state atomically as JSON."""
+        path = path or self.path
+        with self._lock:
+            data = {
+                'n_bins': self.n_bins,
+                'regions': {key: baseline.to_dict() for key, baseline in self.regions.items()}
+            }
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def load(self, path=None):
+        """Replace state with the contents of a JSON file written by save()."""
+        path = path or self.path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading anomaly state: {str(e)}")
+            raise
+        if data.get('n_bins') != self.n_bins:
+            raise ValueError(f"Anomaly state in {path} uses {data.get('n_bins')} bins, expected {self.n_bins}")
+        with self._lock:
+            self.regions = {key: RegionBaseline.from_dict(value) for key, value in data['regions'].items()}
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    """Return the process-wide AnomalyDetector backed by DEFAULT_STATE_PATH."""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = AnomalyDetector()
+        return _detector
@@ -0,0 +1,171 @@
+"""
+Polygon / multipolygon areas of interest (AOIs).
+
+AOIs are loaded from GeoJSON or shapefiles, simplified to an error
+tolerance before they are sent to Earth Engine (reducer cost grows with
+vertex count), and indexed with an STRtree so batch jobs can look up and
+group thousands of AOIs quickly.
+"""
+import numpy as np
+from shapely import STRtree, get_num_coordinates
+from shapely.geometry import Point, box, mapping, shape
+from shapely.ops import unary_union
+
+# Simplification defaults: at most this error (meters) and this many vertices
+DEFAULT_MAX_ERROR_M = 30.0
+DEFAULT_MAX_VERTICES = 500
+
+_METERS_PER_DEGREE = 111320.0
+
+
+def meters_to_degrees(meters):
+    """
+    Conservative degree tolerance for a distance in meters. Uses the latitude
+    scale, the smaller of the two in degrees, so the error stays within
+    `meters` in every direction (east-west it is tighter by cos(latitude)).
+    """
+    return meters / _METERS_PER_DEGREE
+
+
+def simplify_geometry(geom, max_error_m=DEFAULT_MAX_ERROR_M, max_vertices=DEFAULT_MAX_VERTICES):
+    """
+    Simplify a polygon adaptively.
+
+    Uses the smallest tolerance that brings the geometry under max_vertices,
+    searching up to max_error_m. If the vertex budget cannot be met within
+    that error, the geometry simplified at max_error_m is returned.
+    """
+    if get_num_coordinates(geom) <= max_vertices:
+        return geom
+    high = meters_to_degrees(max_error_m)
+    best = geom.simplify(high, preserve_topology=True)
+    if get_num_coordinates(best) > max_vertices:
+        return best
+    low = 0.0
+    # Binary search for the smallest tolerance that meets the budget
+    for _ in range(12):
+        mid = (low + high) / 2
+        candidate = geom.simplify(mid, preserve_topology=True)
+        if get_num_coordinates(candidate) <= max_vertices:
+            best, high = candidate, mid
+        else:
+            low = mid
+    return best
+
+
+def region_from_geometry(geom, name, max_error_m=DEFAULT_MAX_ERROR_M, max_vertices=DEFAULT_MAX_VERTICES):
+    """
+    Build a config 'region' dict for a polygon AOI. 'coordinates' holds the
+    bounding box (used for map centering); 'geometry' holds the simplified
+    GeoJSON that reducers use.
+    """
+    if geom.geom_type not in ('Polygon', 'MultiPolygon'):
+        raise ValueError(f"AOI '{name}' must be a Polygon or MultiPolygon, got {geom.geom_type}")
+    simplified = simplify_geometry(geom, max_error_m, max_vertices)
+    west, south, east, north = simplified.bounds
+    return {
+        'name': name,
+        'coordinates': {'north': north, 'south': south, 'east': east, 'west': west},
+        'geometry': mapping(simplified)
+    }
+
+
+def read_aois(path, name_field=None):
+    """
+    Read AOIs from a GeoJSON file or shapefile (anything geopandas can read)
+    and return (name, geometry) pairs in EPSG:4326, unsimplified.
+    """
+    import geopandas as gpd
+
+    gdf = gpd.read_file(path)
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+    if name_field is None:
+        name_field = next((c for c in ('name', 'NAME', 'Name', 'id') if c in gdf.columns), None)
+
+    aois = []
+    for i, row in enumerate(gdf.itertuples(index=False)):
+        geom = row.geometry
+        if geom is None or geom.is_empty:
+            continue
+        if not geom.is_valid:
+            geom = geom.buffer(0)
+        name = str(getattr(row, name_field)) if name_field else f"AOI {i + 1}"
+        aois.append((name, geom))
+    return aois
+
+
+def load_aois(path, name_field=None, max_error_m=DEFAULT_MAX_ERROR_M, max_vertices=DEFAULT_MAX_VERTICES):
+    """
+    Load AOIs from a GeoJSON file or shapefile (anything geopandas can read)
+    and return a list of region dicts in EPSG:4326.
+    """
+    return [region_from_geometry(geom, name, max_error_m, max_vertices) for name, geom in read_aois(path, name_field)]
+
+
+def load_geojson(data, name="Uploaded AOI", max_error_m=DEFAULT_MAX_ERROR_M, max_vertices=DEFAULT_MAX_VERTICES):
+    """Build a single region from an in-memory GeoJSON dict (Feature, FeatureCollection or geometry)."""
+    if data.get('type') == 'FeatureCollection':
+        geoms = [shape(f['geometry']) for f in data.get('features', []) if f.get('geometry')]
+        if not geoms:
+            raise ValueError("GeoJSON FeatureCollection has no geometries")
+        geom = unary_union(geoms)
+        props = data['features'][0].get('properties') or {}
+    elif data.get('type') == 'Feature':
+        geom = shape(data['geometry'])
+        props = data.get('properties') or {}
+    else:
+        geom = shape(data)
+        props = {}
+    if not geom.is_valid:
+        geom = geom.buffer(0)
+    return region_from_geometry(geom, props.get('name', name), max_error_m, max_vertices)
+
+
+def region_geometry(region):
+    """Shapely geometry of a config region: its polygon if present, otherwise the bounding box."""
+    if region.get('geometry'):
+        return shape(region['geometry'])
+    coords = region['coordinates']
+    return box(coords['west'], coords['south'], coords['east'], coords['north'])
+
+
+class AOIIndex:
+    def __init__(self, regions):
+        """Build an STRtree over a list of region dicts."""
+        self.regions = list(regions)
+        self.geometries = [region_geometry(r) for r in self.regions]
+        self.tree = STRtree(self.geometries)
+
+    def __len__(self):
+        return len(self.regions)
+
+    def query(self, geom, predicate='intersects'):
+        """Regions whose geometry satisfies the predicate against geom."""
+        return [self.regions[i] for i in self.tree.query(geom, predicate=predicate)]
+
+    def query_bounds(self, west, south, east, north):
+        """Regions intersecting a bounding box."""
+        return self.query(box(west, south, east, north))
+
+    def at_point(self, lon, lat):
+        """Regions containing (or touching) a point."""
+        return self.query(Point(lon, lat))
+
+    def nearest(self, geom):
+        """The region nearest to geom."""
+        return self.regions[int(self.tree.nearest(geom))]
+
+    def group_by_cell(self, cell_size_deg):
+        """
+        Group regions by the grid cell containing their centroid, so a batch
+        job can process spatially close AOIs together.
+        """
+        centroids = np.array([(g.centroid.x, g.centroid.y) for g in self.geometries])
+        if len(centroids) == 0:
+            return {}
+        cells = np.floor(centroids / cell_size_deg).astype(np.int64)
+        groups = {}
+        for region, (cx, cy) in zip(self.regions, cells):
+            groups.setdefault((int(cx), int(cy)), []).append(region)
+        return groups
@@ -5,24 +5,27 @@ import pandas as pd
 import os
 import sys
 import streamlit as st
+from config.settings import APP_CONFIG_PATH, get_config
+from src.indices import build_index_image, parse_index_types
+from src.tracing import get_info, traced
 
 class DataFetcher:
-    def __init__(self, config_path='config/config.json', region=None):
+    def __init__(self, config_path=APP_CONFIG_PATH, region=None, profile=None):
         """Initialize the DataFetcher with configuration."""
-        self.config = self._load_config(config_path)
+        self.config = self._load_config(config_path, profile)
         if region is not None:
             self.config['region'] = region
         self._initialize_ee()
         
-    def _load_config(self, config_path):
-        """Load configuration from JSON file."""
+    def _load_config(self, config_path, profile=None):
+        """Load configuration (cached, validated) with an optional region profile applied."""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return get_config(profile, path=config_path)
         except Exception as e:
             print(f"Error loading config: {str(e)}")
             raise
         
+    @traced('ee.initialize')
     def _initialize_ee(self):
         """Initialize Earth Engine API with Windows-specific handling."""
         try:
@@ -33,30 +36,39 @@ class DataFetcher:
             raise e
     
     def get_region(self):
-        """Convert config coordinates to Earth Engine geometry."""
+        """Convert the config region (polygon AOI or rectangle) to Earth Engine geometry."""
+        geometry = self.config['region'].get('geometry')
+        if geometry:
+            # Already simplified when the AOI was loaded (see src/aoi.py)
+            return ee.Geometry(geometry, None, False)
         coords = self.config['region']['coordinates']
         return ee.Geometry.Rectangle([
             coords['west'], coords['south'],
             coords['east'], coords['north']
         ])
     
+    def build_collection(self, start_date=None, end_date=None):
+        """Filtered image collection for the region and dates, without any server round trip."""
+        region = self.get_region()
+        # Use provided dates if given, else fall back to config
+        if start_date is None:
+            start_date = self.config['date_range']['start_date']
+        if end_date is None:
+            end_date = self.config['date_range']['end_date']
+
+        return ee.ImageCollection(self.config['satellite']) \
+            .filterBounds(region) \
+            .filterDate(start_date, end_date) \
+            .filter(ee.Filter.lt('CLOUD_COVER', self.config['cloud_cover_threshold']))
+
+    @traced('DataFetcher.fetch_satellite_data')
     def fetch_satellite_data(self, start_date=None, end_date=None):
         """Fetch satellite data based on configuration or provided dates."""
         try:
-            region = self.get_region()
-            # Use provided dates if given, else fall back to config
-            if start_date is None:
-                start_date = self.config['date_range']['start_date']
-            if end_date is None:
-                end_date = self.config['date_range']['end_date']
-
-            collection = ee.ImageCollection(self.config['satellite']) \
-                .filterBounds(region) \
-                .filterDate(start_date, end_date) \
-                .filter(ee.Filter.lt('CLOUD_COVER', self.config['cloud_cover_threshold']))
+            collection = self.build_collection(start_date, end_date)
             
             # Add validation
-            count = collection.size().getInfo()
+            count = get_info(collection.size(), 'ee.collection_size')
             if count == 0:
                 raise ValueError(f"No satellite images found for the selected region and time period. Try adjusting the date range or cloud cover threshold.")
             
@@ -69,27 +81,27 @@ class DataFetcher:
     def calculate_ndvi(self, image):
         """Calculate NDVI for a given image."""
         try:
-            # Calculate NDVI using Earth Engine's normalizedDifference
-            ndvi = image.normalizedDifference(['B5', 'B4']).rename('NDVI')
-            
-            # Add a mask to remove invalid values
-            ndvi = ndvi.updateMask(ndvi.gt(-1).And(ndvi.lt(1)))
-            
-            return ndvi
+            # NDVI from B5/B4, masked to the valid (-1, 1) range
+            return build_index_image(image, ['NDVI'])
         except Exception as e:
             print(f"Error calculating NDVI: {str(e)}")
             raise
 
+    def get_index_types(self):
+        """Return the index names requested by the config 'index_type', always including NDVI."""
+        names = parse_index_types(self.config.get('index_type'))
+        return names if 'NDVI' in names else ['NDVI'] + names
+
+    def calculate_indices(self, image, indices=None):
+        """Calculate all requested indices as bands of a single image."""
+        try:
+            if indices is None:
+                indices = self.get_index_types()
+            return build_index_image(image, indices)
+        except Exception as e:
+            print(f"Error calculating indices: {str(e)}")
+            raise
+
     def update_region(self, region):
         """Update the region configuration."""
         self.config['region'] = region
-
-if 'region' in st.session_state:
-    region = st.session_state['region']
-else:
-    import json
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
-    region = config['region']
-
-data_fetcher = DataFetcher(region=region) 
\ No newline at end of file
@@ -0,0 +1,114 @@
+import numpy as np
+
+# Default chart width in pixels; roughly the Streamlit wide-layout container
+DEFAULT_WIDTH_PX = 1200
+# Above this many points per trace Plotly switches to WebGL (Scattergl)
+WEBGL_THRESHOLD = 1000
+
+
+def _as_float(x):
+    """Numeric view of x for geometry (datetime64 -> int64 nanoseconds)."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the selected points, always including the first
+    and last point. NaN values in y are skipped.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    xf = _as_float(x)[valid]
+    yf = y[valid]
+
+    # Bucket edges for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if end <= start:
+            end = start + 1
+        # Average of the next bucket is the third triangle vertex
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_end = next_start + 1
+        avg_x = xf[next_start:next_end].mean()
+        avg_y = yf[next_start:next_end].mean()
+        areas = np.abs(
+            (xf[a] - avg_x) * (yf[start:end] - yf[a])
+            - (xf[a] - xf[start:end]) * (avg_y - yf[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return valid[selected]
+
+
+def minmax(x, y, n_out):
+    """
+    Min/max decimation: keep the minimum and maximum of each of n_out / 2
+    equal-count buckets (plus the endpoints). Preserves spikes exactly.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n_out >= n or n_out < 4:
+        return valid
+    yf = y[valid]
+    buckets = max(1, (n_out - 2) // 2)
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    lows = np.minimum.reduceat(yf, starts)
+    highs = np.maximum.reduceat(yf, starts)
+    bucket_of = np.repeat(np.arange(buckets), np.diff(np.append(starts, n)))
+    is_low = yf == lows[bucket_of]
+    is_high = yf == highs[bucket_of]
+    # First occurrence of the min and max in each bucket
+    low_idx = starts + np.array([np.argmax(is_low[s:e]) for s, e in zip(starts, np.append(starts[1:], n))])
+    high_idx = starts + np.array([np.argmax(is_high[s:e]) for s, e in zip(starts, np.append(starts[1:], n))])
+    keep = np.unique(np.concatenate(([0, n - 1], low_idx, high_idx)))
+    return valid[keep]
+
+
+def decimate(x, y, width_px=DEFAULT_WIDTH_PX, method='lttb'):
+    """
+    Reduce (x, y) to about one point per horizontal pixel.
+
+    Returns (x, y) arrays; the input is returned unchanged when it already
+    fits in width_px points.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= width_px:
+        return x, y
+    if method == 'minmax':
+        idx = minmax(x, y, width_px)
+    elif method == 'lttb':
+        idx = lttb(x, y, width_px)
+    else:
+        raise ValueError(f"Unknown decimation method: {method}")
+    return x[idx], y[idx]
+
+
+def slice_range(x, x_range):
+    """Boolean mask of x values inside an inclusive (start, end) range; None means all."""
+    x = np.asarray(x)
+    if x_range is None:
+        return np.ones(len(x), dtype=bool)
+    start, end = x_range
+    mask = np.ones(len(x), dtype=bool)
+    if start is not None:
+        mask &= x >= np.asarray(start, dtype=x.dtype)
+    if end is not None:
+        mask &= x <= np.asarray(end, dtype=x.dtype)
+    return mask
@@ -0,0 +1,177 @@
+"""
+Batch forecasting for many index series.
+
+Prophet fits one series at a time, which is too slow for every monitored
+site or grid cell. The batch forecaster fits a linear trend plus yearly
+Fourier seasonality by least squares. Series observed on the same dates
+share one design matrix and are solved together in a single matrix
+product. The remaining groups are spread over a process pool. The result
+is a tidy table (series_id, ds, yhat, yhat_lower, yhat_upper) that
+plotting code can consume without refitting.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from src.series import NDVISeries
+from src.tracing import span, traced
+
+DEFAULT_YEARLY_ORDER = 3
+DEFAULT_INTERVAL_WIDTH = 0.8
+FORECAST_COLUMNS = ['series_id', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+_DAYS_PER_YEAR = 365.25
+_NS_PER_DAY = 86400 * 10 ** 9
+
+
+def _design_matrix(days, yearly_order):
+    """Columns: intercept, trend (years) and yearly sin/cos pairs."""
+    years = days / _DAYS_PER_YEAR
+    columns = [np.ones_like(years), years]
+    for k in range(1, yearly_order + 1):
+        angle = 2 * np.pi * k * years
+        columns.append(np.sin(angle))
+        columns.append(np.cos(angle))
+    return np.column_stack(columns)
+
+
+def future_dates(last_date, periods, freq='ME'):
+    """Same future dates Prophet's make_future_dataframe would produce."""
+    if freq == 'ME':
+        # Month ends computed in numpy; pd.date_range costs ~1 ms per call
+        last_date = np.datetime64(last_date, 'ns')
+        month = last_date.astype('datetime64[M]')
+        ends = ((month + np.arange(periods + 1) + 1).astype('datetime64[D]') - 1).astype('datetime64[ns]')
+        return ends[ends > last_date][:periods]
+    last_date = pd.Timestamp(last_date)
+    dates = pd.date_range(start=last_date, periods=periods + 1, freq=freq)
+    return dates[dates > last_date][:periods].to_numpy(dtype='datetime64[ns]')
+
+
+def fit_group(dates, Y, periods=60, freq='ME', yearly_order=DEFAULT_YEARLY_ORDER,
+              interval_width=DEFAULT_INTERVAL_WIDTH, include_history=True):
+    """
+    Fit every column of Y (n_dates x n_series) against the shared dates in one
+    solve. Returns (ds, yhat, lower, upper) with one column per series.
+    """
+    n = len(dates)
+    # Drop harmonics the data cannot support (need at least one residual degree of freedom)
+    order = max(min(yearly_order, (n - 3) // 2), 0)
+    origin = dates[0]
+    days = (dates - origin).astype(np.int64) / _NS_PER_DAY
+    X = _design_matrix(days, order)
+    if n < X.shape[1]:
+        X = X[:, :n]
+
+    # Least squares through the SVD so a rank-deficient design (e.g. every
+    # scene on one date) gets the minimum-norm fit instead of failing
+    U, singular, Vt = np.linalg.svd(X, full_matrices=False)
+    keep = singular > singular[0] * max(X.shape) * np.finfo(np.float64).eps
+    U, singular, Vt = U[:, keep], singular[keep], Vt[keep]
+    coef = Vt.T @ ((U.T @ Y) / singular[:, None])
+    residuals = Y - X @ coef
+    dof = max(n - int(keep.sum()), 1)
+    sigma = np.sqrt((residuals ** 2).sum(axis=0) / dof)
+
+    future = future_dates(dates[-1], periods, freq)
+    ds = np.concatenate([dates, future]) if include_history else future
+    Xf = _design_matrix((ds - origin).astype(np.int64) / _NS_PER_DAY, order)[:, :X.shape[1]]
+    yhat = Xf @ coef
+
+    # Prediction interval: residual noise plus parameter uncertainty (leverage)
+    leverage = (((Vt @ Xf.T) / singular[:, None]) ** 2).sum(axis=0)
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+    half_width = z * np.sqrt(1.0 + leverage)[:, None] * sigma[None, :]
+    return ds, yhat, yhat - half_width, yhat + half_width
+
+
+def _fit_groups(groups, options):
+    """Worker entry point: fit a list of (ids, dates, Y) groups and return one tidy frame."""
+    columns = {name: [] for name in FORECAST_COLUMNS}
+    for ids, dates, Y in groups:
+        ds, yhat, lower, upper = fit_group(dates, Y, **options)
+        # Fill an object array explicitly so tuple ids are not expanded into a 2-D array
+        id_array = np.empty(len(ids), dtype=object)
+        id_array[:] = ids
+        columns['series_id'].append(np.repeat(id_array, len(ds)))
+        columns['ds'].append(np.tile(ds, len(ids)))
+        columns['yhat'].append(yhat.T.ravel())
+        columns['yhat_lower'].append(lower.T.ravel())
+        columns['yhat_upper'].append(upper.T.ravel())
+    if not groups:
+        return pd.DataFrame(columns=FORECAST_COLUMNS)
+    # One frame per chunk; building a DataFrame per group dominates small fits
+    return pd.DataFrame({name: np.concatenate(parts) for name, parts in columns.items()})
+
+
+def _as_arrays(value, index):
+    if isinstance(value, NDVISeries):
+        series = value.dropna(index)
+        return series.dates, series.values[index].astype(np.float64)
+    dates, values = value
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=np.float64)
+    keep = ~np.isnan(values)
+    order = np.argsort(dates[keep], kind='stable')
+    return dates[keep][order], values[keep][order]
+
+
+def group_series(series, index='NDVI', min_points=3):
+    """
+    Group series observed on identical dates. `series` maps an id to an
+    NDVISeries or a (dates, values) pair. Series with fewer than
+    min_points valid values are left out.
+    """
+    groups = {}
+    for series_id, value in series.items():
+        dates, values = _as_arrays(value, index)
+        if len(dates) < min_points:
+            continue
+        key = (len(dates), dates.tobytes())
+        entry = groups.setdefault(key, (dates, [], []))
+        entry[1].append(series_id)
+        entry[2].append(values)
+    return [(ids, dates, np.column_stack(columns)) for dates, ids, columns in groups.values()]
+
+
+def _chunk(groups, n_chunks):
+    """Split groups into n_chunks lists of roughly equal work (largest first)."""
+    chunks = [[] for _ in range(n_chunks)]
+    loads = [0] * n_chunks
+    for group in sorted(groups, key=lambda g: g[2].size, reverse=True):
+        i = loads.index(min(loads))
+        chunks[i].append(group)
+        loads[i] += group[2].size
+    return [c for c in chunks if c]
+
+
+@traced('forecast_batch')
+def forecast_batch(series, periods=60, freq='ME', index='NDVI', yearly_order=DEFAULT_YEARLY_ORDER,
+                   interval_width=DEFAULT_INTERVAL_WIDTH, include_history=True, n_jobs=None):
+    """
+    Forecast many series at once.
+
+    Returns a tidy DataFrame with one row per (series_id, ds). n_jobs=None
+    uses every core and n_jobs=1 runs in-process.
+    """
+    try:
+        options = {'periods': periods, 'freq': freq, 'yearly_order': yearly_order,
+                   'interval_width': interval_width, 'include_history': include_history}
+        with span('forecast_batch.group', series=len(series)):
+            groups = group_series(series, index)
+        n_jobs = n_jobs or os.cpu_count() or 1
+        # A handful of groups is faster to fit than to ship to worker processes
+        if n_jobs == 1 or len(groups) < 2 * n_jobs:
+            return _fit_groups(groups, options)
+
+        chunks = _chunk(groups, n_jobs * 4)
+        with span('forecast_batch.pool', groups=len(groups), chunks=len(chunks), workers=n_jobs):
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                frames = list(pool.map(_fit_groups, chunks, [options] * len(chunks)))
+        return pd.concat(frames, ignore_index=True)
+    except Exception as e:
+        print(f"Error in batch forecasting: {str(e)}")
+        raise
@@ -1,4 +1,37 @@
 import requests
+from src.governor import RetryableError, get_governor
+from src.tracing import span
+
+# Google Maps web service statuses that mean "try again later" rather than a bad request
+RETRYABLE_MAPS_STATUS = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+# Statuses that are a valid answer with nothing in it
+EMPTY_MAPS_STATUS = {'ZERO_RESULTS', 'NOT_FOUND'}
+
+
+def fetch_json(service, url, params, span_name, timeout=10):
+    """GET a JSON endpoint through the service's governor; HTTP errors raise so they can be retried."""
+    def fetch():
+        with span(span_name) as record:
+            response = requests.get(url, params=params, timeout=timeout)
+            record['attrs']['bytes'] = len(response.content)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict) and data.get('status') in RETRYABLE_MAPS_STATUS:
+            raise RetryableError(f"{span_name}: {data['status']}")
+        return data
+    return get_governor(service).call(fetch)
+
+
+def google_maps_results(url, params, span_name, key='results'):
+    """Call a Google Maps web service and return its result list; empty for ZERO_RESULTS, raises otherwise."""
+    data = fetch_json('google_maps', url, params, span_name)
+    status = data.get('status')
+    if status in EMPTY_MAPS_STATUS:
+        return []
+    if status != 'OK':
+        raise ValueError(f"Google Maps request failed: {status} {data.get('error_message', '')}".strip())
+    return data.get(key, [])
+
 
 def geocode_place(place_name):
     url = "https://nominatim.openstreetmap.org/search"
@@ -7,8 +40,7 @@ def geocode_place(place_name):
         "format": "json",
         "limit": 1
     }
-    response = requests.get(url, params=params)
-    results = response.json()
+    results = fetch_json('nominatim', url, params, 'http.nominatim_search')
     if results:
         lat = float(results[0]['lat'])
         lon = float(results[0]['lon'])
@@ -0,0 +1,297 @@
+"""
+Quota-aware request governor for external APIs.
+
+Every call to Earth Engine, Google Maps, Nominatim or Gemini goes through the
+governor for its service. The governor applies:
+
+- a concurrency cap (requests in flight),
+- a token bucket that keeps the request rate at or below the quota,
+- jittered exponential retry for retryable errors (429, 5xx, timeouts,
+  quota messages), honouring Retry-After when the server sends one,
+- a circuit breaker that fails fast while a service keeps failing.
+
+It also keeps metrics for queue depth, retries and rejections.
+"""
+import random
+import threading
+import time
+
+import requests
+
+from src.tracing import get_tracer
+
+# Defaults per service; adjust with configure() to match the project's quotas
+SERVICE_LIMITS = {
+    'earthengine': {'max_concurrent': 10, 'rate_per_sec': 20.0, 'burst': 40},
+    'google_maps': {'max_concurrent': 10, 'rate_per_sec': 50.0, 'burst': 50},
+    'gemini': {'max_concurrent': 4, 'rate_per_sec': 1.0, 'burst': 5},
+    # Nominatim's usage policy allows at most one request per second
+    'nominatim': {'max_concurrent': 1, 'rate_per_sec': 1.0, 'burst': 1},
+}
+DEFAULT_LIMITS = {
+    'max_concurrent': 8,
+    'rate_per_sec': 10.0,
+    'burst': 10,
+    'max_retries': 4,
+    'base_delay': 0.5,
+    'max_delay': 30.0,
+    'failure_threshold': 5,
+    'reset_timeout': 30.0,
+    'queue_timeout': 60.0,
+}
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Exception class names used by google-api-core (Gemini) for transient failures
+RETRYABLE_ERROR_NAMES = {'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError',
+                         'TooManyRequests', 'GatewayTimeout', 'BadGateway'}
+# Earth Engine reports quota and transient failures as EEException messages
+RETRYABLE_MESSAGES = ('too many requests', 'quota', 'rate limit', 'service unavailable', 'backend error',
+                      'internal error', 'deadline exceeded', '503', '429')
+
+
+class GovernorRejected(RuntimeError):
+    """Raised when a call is refused without being attempted (circuit open or queue timeout)."""
+
+
+class RetryableError(RuntimeError):
+    """Raise from a governed call to request a retry, e.g. for an API-level OVER_QUERY_LIMIT status."""
+
+
+def is_retryable(error):
+    """Whether an exception from Earth Engine, requests or Gemini is worth retrying."""
+    if isinstance(error, RetryableError):
+        return True
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    if getattr(error, 'code', None) in RETRYABLE_STATUS:
+        return True
+    if type(error).__name__ == 'EEException':
+        message = str(error).lower()
+        return any(text in message for text in RETRYABLE_MESSAGES)
+    return False
+
+
+def _retry_after(error):
+    """Seconds from a Retry-After header, if the error carries one."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec, burst):
+        """Allow `rate_per_sec` acquisitions per second on average, up to `burst` at once."""
+        self.rate = rate_per_sec
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting if necessary. Returns seconds waited, or None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return None
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout):
+        """Open after `failure_threshold` consecutive failures; allow one probe after `reset_timeout` s."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Free the half-open probe slot without a verdict (the call never reached the service)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class ServiceGovernor:
+    def __init__(self, name, **limits):
+        """Concurrency cap, rate limit, retry and circuit breaker for one external service."""
+        settings = {**DEFAULT_LIMITS, **limits}
+        self.name = name
+        self.max_concurrent = settings['max_concurrent']
+        self.max_retries = settings['max_retries']
+        self.base_delay = settings['base_delay']
+        self.max_delay = settings['max_delay']
+        self.queue_timeout = settings['queue_timeout']
+        self.bucket = TokenBucket(settings['rate_per_sec'], settings['burst'])
+        self.breaker = CircuitBreaker(settings['failure_threshold'], settings['reset_timeout'])
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._metrics = {
+            'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0, 'rejections': 0,
+            'in_flight': 0, 'queue_depth': 0, 'max_queue_depth': 0, 'throttled_ms': 0.0
+        }
+
+    def _bump(self, key, value=1):
+        with self._lock:
+            self._metrics[key] += value
+            if key == 'queue_depth':
+                self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], self._metrics['queue_depth'])
+
+    def _reject(self, reason):
+        self._bump('rejections')
+        get_tracer().count(f"governor.{self.name}.rejected")
+        raise GovernorRejected(f"{self.name}: {reason}")
+
+    def _attempt(self, fn, args, kwargs):
+        """One attempt: wait for a slot and a token, then call."""
+        self._bump('queue_depth')
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self._reject(f"no free slot within {self.queue_timeout:.0f}s")
+        finally:
+            self._bump('queue_depth', -1)
+        try:
+            waited = self.bucket.acquire(timeout=self.queue_timeout)
+            if waited is None:
+                self._reject(f"rate limit wait exceeded {self.queue_timeout:.0f}s")
+            self._bump('throttled_ms', waited * 1000)
+            self._bump('in_flight')
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._bump('in_flight', -1)
+        finally:
+            self._slots.release()
+
+    def _guarded_attempt(self, fn, args, kwargs):
+        """One attempt whose outcome the breaker learns on every exit path, so a probe never stays in flight."""
+        outcome = None
+        try:
+            result = self._attempt(fn, args, kwargs)
+            outcome = 'success'
+            return result
+        except GovernorRejected:
+            raise
+        except Exception as e:
+            # A non-retryable error (bad request, auth) means the service answered
+            outcome = 'failure' if is_retryable(e) else 'success'
+            raise
+        finally:
+            if outcome == 'success':
+                self.breaker.record_success()
+            elif outcome == 'failure':
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_probe()
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) under this service's limits, retrying retryable errors."""
+        self._bump('calls')
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._reject("circuit open after repeated failures")
+            try:
+                result = self._guarded_attempt(fn, args, kwargs)
+            except GovernorRejected:
+                raise
+            except Exception as e:
+                # No point waiting to retry into a circuit this failure just opened
+                if (not is_retryable(e) or attempt >= self.max_retries
+                        or self.breaker.state == CircuitBreaker.OPEN):
+                    self._bump('failures')
+                    raise
+                # Full jitter keeps many clients from retrying in lockstep
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, self.max_delay))
+                attempt += 1
+                self._bump('retries')
+                get_tracer().count(f"governor.{self.name}.retry")
+                print(f"Retrying {self.name} call in {delay:.2f}s after error: {str(e)}")
+                time.sleep(delay)
+                continue
+            self._bump('successes')
+            return result
+
+    def metrics(self):
+        """Snapshot of counters plus the circuit state."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+        snapshot['throttled_ms'] = round(snapshot['throttled_ms'], 1)
+        snapshot['circuit'] = self.breaker.state
+        return snapshot
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(name):
+    """Return the process-wide governor for a service."""
+    with _governors_lock:
+        if name not in _governors:
+            _governors[name] = ServiceGovernor(name, **SERVICE_LIMITS.get(name, {}))
+        return _governors[name]
+
+
+def configure(name, **limits):
+    """Replace a service's governor with new limits (e.g. a higher paid-tier quota)."""
+    with _governors_lock:
+        SERVICE_LIMITS[name] = {**SERVICE_LIMITS.get(name, {}), **limits}
+        _governors[name] = ServiceGovernor(name, **SERVICE_LIMITS[name])
+        return _governors[name]
+
+
+def all_metrics():
+    """Metrics for every governor created so far."""
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {g.name: g.metrics() for g in governors}
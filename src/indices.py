@@ -0,0 +1,68 @@
+"""
+Registry of spectral indices computed from Landsat 8 bands
+(B2 blue, B3 green, B4 red, B5 NIR, B6 SWIR1).
+
+Every index is built as a band of one image, so a single reduceRegion call
+evaluates all requested indices together.
+"""
+
+SAVI_L = 0.5
+
+
+def _ndvi(image):
+    return image.normalizedDifference(['B5', 'B4'])
+
+
+def _ndwi(image):
+    # McFeeters NDWI: open water is positive, vegetation and soil negative
+    return image.normalizedDifference(['B3', 'B5'])
+
+
+def _evi(image):
+    nir = image.select('B5')
+    red = image.select('B4')
+    blue = image.select('B2')
+    return nir.subtract(red).multiply(2.5).divide(
+        nir.add(red.multiply(6)).subtract(blue.multiply(7.5)).add(1)
+    )
+
+
+def _savi(image):
+    nir = image.select('B5')
+    red = image.select('B4')
+    return nir.subtract(red).multiply(1 + SAVI_L).divide(nir.add(red).add(SAVI_L))
+
+
+# name -> (builder, (valid_min, valid_max)); values outside the range are masked
+INDEX_REGISTRY = {
+    'NDVI': (_ndvi, (-1, 1)),
+    'EVI': (_evi, (-1, 1)),
+    'NDWI': (_ndwi, (-1, 1)),
+    'SAVI': (_savi, (-1.5, 1.5)),
+}
+
+
+def parse_index_types(value):
+    """Normalize the config 'index_type' (string, comma-separated string or list) to a list of names."""
+    if value is None:
+        return ['NDVI']
+    if isinstance(value, str):
+        value = value.split(',')
+    names = [str(v).strip().upper() for v in value if str(v).strip()]
+    unknown = [n for n in names if n not in INDEX_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown index type(s): {', '.join(unknown)}. Available: {', '.join(INDEX_REGISTRY)}")
+    return names or ['NDVI']
+
+
+def build_index_image(image, names):
+    """Return one image with a masked band per requested index."""
+    bands = []
+    for name in names:
+        builder, (valid_min, valid_max) = INDEX_REGISTRY[name]
+        band = builder(image).rename(name)
+        bands.append(band.updateMask(band.gt(valid_min).And(band.lt(valid_max))))
+    result = bands[0]
+    for band in bands[1:]:
+        result = result.addBands(band)
+    return result
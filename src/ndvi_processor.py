@@ -1,6 +1,28 @@
+import contextvars
 import ee
 import numpy as np
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.series import NDVISeries
+from src.tracing import get_info, span, traced
+
+# Streamed time-series fetch: days per request and requests in flight
+DEFAULT_CHUNK_DAYS = 180
+DEFAULT_MAX_WORKERS = 4
+
+
+def split_date_range(start_date, end_date, chunk_days=DEFAULT_CHUNK_DAYS):
+    """Split [start_date, end_date) into consecutive (start, end) YYYY-MM-DD chunks."""
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    chunks = []
+    while start < end:
+        chunk_end = min(start + timedelta(days=chunk_days), end)
+        chunks.append((start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')))
+        start = chunk_end
+    return chunks
+
 
 class NDVIProcessor:
     def __init__(self, data_fetcher):
@@ -11,66 +33,70 @@ class NDVIProcessor:
     def detect_deforestation(self, ndvi_image):
         """Detect areas with NDVI below threshold."""
         threshold = self.config['alert_threshold']
-        deforestation_mask = ndvi_image.lt(threshold)
+        deforestation_mask = ndvi_image.select('NDVI').lt(threshold)
         return deforestation_mask
     
-    def get_statistics(self, ndvi_image):
-        """Calculate basic statistics for the NDVI image."""
+    @traced('NDVIProcessor.get_statistics')
+    def get_statistics(self, index_image):
+        """Calculate mean and stdDev for every index band in a single reduction."""
         try:
             region = self.data_fetcher.get_region()
             
-            # Calculate mean and stdDev separately
-            mean = ndvi_image.reduceRegion(
-                reducer=ee.Reducer.mean(),
-                geometry=region,
-                scale=30,
-                maxPixels=1e9
+            # One combined reducer gives <band>_mean and <band>_stdDev for all bands
+            reducer = ee.Reducer.mean().combine(
+                reducer2=ee.Reducer.stdDev(),
+                sharedInputs=True
             )
-            
-            stdDev = ndvi_image.reduceRegion(
-                reducer=ee.Reducer.stdDev(),
+            stats = index_image.reduceRegion(
+                reducer=reducer,
                 geometry=region,
                 scale=30,
                 maxPixels=1e9
             )
             
-            # Get the results
-            mean_info = mean.getInfo()
-            stdDev_info = stdDev.getInfo()
-            
-            return {
-                'NDVI_mean': mean_info.get('NDVI'),
-                'NDVI_stdDev': stdDev_info.get('NDVI')
-            }
+            return get_info(stats, 'ee.stats')
         except Exception as e:
             print(f"Error calculating statistics: {str(e)}")
             raise
     
-    def process_time_series(self):
-        """Process NDVI time series for the region."""
+    @traced('NDVIProcessor.process_time_series')
+    def process_time_series(self, start_date=None, end_date=None, validate=True):
+        """Process NDVI time series for the region (validate=False skips the empty-collection check)."""
         try:
-            collection = self.data_fetcher.fetch_satellite_data()
+            if validate:
+                collection = self.data_fetcher.fetch_satellite_data(start_date, end_date)
+            else:
+                collection = self.data_fetcher.build_collection(start_date, end_date)
+            indices = self.data_fetcher.get_index_types()
+            region = self.data_fetcher.get_region()
             
             def process_image(image):
-                # Calculate NDVI
-                ndvi = self.data_fetcher.calculate_ndvi(image)
+                # Calculate all indices as bands of one image
+                index_image = self.data_fetcher.calculate_indices(image, indices)
                 
                 # Get the date
                 date = ee.Date(image.get('system:time_start')).format('YYYY-MM-dd')
                 
-                # Calculate mean NDVI for the region
-                mean_ndvi = ndvi.reduceRegion(
-                    reducer=ee.Reducer.mean(),
-                    geometry=self.data_fetcher.get_region(),
+                # Mean and valid-pixel count of every index in a single reduction
+                stats = index_image.reduceRegion(
+                    reducer=ee.Reducer.mean().combine(
+                        reducer2=ee.Reducer.count(),
+                        sharedInputs=True
+                    ),
+                    geometry=region,
                     scale=30,
                     maxPixels=1e9
-                ).get('NDVI')
+                )
                 
-                # Create a feature with the date and NDVI value
-                return ee.Feature(None, {
+                # Create a feature with the date, one property per index and quality columns
+                properties = {
                     'date': date,
-                    'NDVI': mean_ndvi
-                })
+                    'pixel_count': stats.get('NDVI_count'),
+                    'cloud_cover': image.get('CLOUD_COVER')
+                }
+                for name in indices:
+                    properties[name] = stats.get(f"{name}_mean")
+                return ee.Feature(None, properties)
             
             # Map the function over the collection
             ndvi_collection = collection.map(process_image)
@@ -78,4 +104,79 @@ class NDVIProcessor:
             return ndvi_collection
         except Exception as e:
             print(f"Error processing time series: {str(e)}")
+            raise
+    
+    def _fetch_chunk(self, start_date, end_date, indices):
+        with span('NDVIProcessor.fetch_chunk', start_date=start_date, end_date=end_date):
+            return NDVISeries.from_collection(
+                self.process_time_series(start_date, end_date, validate=False),
+                indices,
+                self.config['region'].get('name')
+            )
+
+    def iter_time_series(self, start_date=None, end_date=None, chunk_days=DEFAULT_CHUNK_DAYS,
+                         max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Yield the time series as NDVISeries chunks in date order.
+
+        The date range is split into chunk_days requests, at most max_workers
+        of which are in flight. Each request stays well below the server's
+        element and timeout limits, and only the in-flight chunks are held in
+        memory while the caller consumes earlier ones.
+        """
+        start_date = start_date or self.config['date_range']['start_date']
+        end_date = end_date or self.config['date_range']['end_date']
+        indices = self.data_fetcher.get_index_types()
+        chunks = iter(split_date_range(start_date, end_date, chunk_days))
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        pending = deque()
+
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk is not None:
+                # Run in a copy of this context so spans land on the caller's tracer
+                pending.append(pool.submit(contextvars.copy_context().run, self._fetch_chunk, *chunk, indices))
+
+        try:
+            for _ in range(max_workers):
+                submit_next()
+            while pending:
+                series = pending.popleft().result()
+                submit_next()
+                yield series
+        except Exception as e:
+            print(f"Error streaming time series: {str(e)}")
+            raise
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @traced('NDVIProcessor.get_time_series')
+    def get_time_series(self, ndvi_collection=None, progress=None, start_date=None, end_date=None):
+        """
+        Return the processed time series as a columnar NDVISeries.
+
+        Without ndvi_collection, the series between start_date and end_date
+        (default: the config date range) is streamed in date chunks (see
+        iter_time_series); progress, if given, is called with the number of
+        scenes received so far after each chunk.
+        """
+        try:
+            indices = self.data_fetcher.get_index_types()
+            if ndvi_collection is not None:
+                return NDVISeries.from_collection(ndvi_collection, indices, self.config['region'].get('name'))
+
+            parts = []
+            received = 0
+            for part in self.iter_time_series(start_date, end_date):
+                parts.append(part)
+                received += len(part)
+                if progress is not None:
+                    progress(received)
+            series = NDVISeries.concat(parts, indices, self.config['region'].get('name'))
+            if len(series) == 0:
+                raise ValueError("No satellite images found for the selected region and time period. "
+                                 "Try adjusting the date range or cloud cover threshold.")
+            return series
+        except Exception as e:
+            print(f"Error fetching time series: {str(e)}")
             raise 
\ No newline at end of file
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+from src.tracing import get_tracer
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("RESULT_STORE_MAX_MB", 512)) * 1024 * 1024)
+DEFAULT_SESSION_MAX_BYTES = int(float(os.environ.get("RESULT_STORE_SESSION_MB", 64)) * 1024 * 1024)
+
+# Config keys that change computed results; everything else (e.g. 'name') is ignored
+RESULT_CONFIG_KEYS = ('satellite', 'cloud_cover_threshold', 'index_type', 'alert_threshold')
+
+
+def estimate_size(value):
+    """Approximate memory footprint of a cached value in bytes."""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values()) + sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value) + sys.getsizeof(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def result_key(kind, config, **params):
+    """
+    Stable cache key for a result computed from a region, date range and
+    settings. Two sessions asking for the same thing get the same key.
+    """
+    region = config.get('region', {})
+    payload = {
+        'kind': kind,
+        'coordinates': region.get('coordinates'),
+        'geometry': region.get('geometry'),
+        'date_range': config.get('date_range'),
+        'settings': {k: config.get(k) for k in RESULT_CONFIG_KEYS},
+        'params': params
+    }
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f"{kind}:{digest[:20]}"
+
+
+def region_key(config):
+    """Stable key for a region and its result-affecting settings, independent of the date range."""
+    return result_key('region', {k: v for k, v in config.items() if k != 'date_range'})
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'owner')
+
+    def __init__(self, value, size, owner):
+        self.value = value
+        self.size = size
+        self.owner = owner
+
+
+class ResultStore:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, session_max_bytes=DEFAULT_SESSION_MAX_BYTES):
+        """Process-wide LRU store of computed results, shared by all sessions."""
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self._entries = OrderedDict()
+        self._owner_bytes = {}
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return a cached value and mark it recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                get_tracer().record_cache('result_store', False)
+                return default
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            get_tracer().record_cache('result_store', True)
+            return entry.value
+
+    def put(self, key, value, owner=None):
+        """Store a value, charging its size to `owner` (a session id) for the per-session budget."""
+        size = estimate_size(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = _Entry(value, size, owner)
+            self.total_bytes += size
+            self._owner_bytes[owner] = self._owner_bytes.get(owner, 0) + size
+            self._evict(owner, keep=key)
+        return value
+
+    def get_or_compute(self, key, compute, owner=None):
+        """
+        Return the cached value for key, computing it at most once even if
+        several sessions ask concurrently.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    return entry.value
+            try:
+                return self.put(key, compute(), owner)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owner_bytes.clear()
+            self.total_bytes = 0
+
+    def owner_bytes(self, owner):
+        with self._lock:
+            return self._owner_bytes.get(owner, 0)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        remaining = self._owner_bytes.get(entry.owner, 0) - entry.size
+        if remaining > 0:
+            self._owner_bytes[entry.owner] = remaining
+        else:
+            self._owner_bytes.pop(entry.owner, None)
+
+    def _evict(self, owner, keep):
+        # Per-session budget first: drop this session's least recently used results
+        if owner is not None:
+            for key in [k for k, e in self._entries.items() if e.owner == owner and k != keep]:
+                if self._owner_bytes.get(owner, 0) <= self.session_max_bytes:
+                    break
+                self._remove(key)
+                self.stats['evictions'] += 1
+        # Then the global budget, oldest first
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                self._entries.move_to_end(keep)
+                oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats['evictions'] += 1
+
+
+_MISSING = object()
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Return the process-wide ResultStore shared by all Streamlit sessions."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
+
+
+def current_session_id():
+    """Streamlit session id of the running script, or None outside Streamlit."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else None
+    except Exception:
+        return None
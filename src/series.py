@@ -0,0 +1,195 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.tracing import get_info, span
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow is required for Arrow/Parquet persistence: pip install pyarrow")
+    return pa, pq
+
+
+class NDVISeries:
+    """
+    Columnar index time series for one region.
+
+    dates are datetime64[ns], every index column is float32, pixel_count is
+    int32 (valid pixels per scene) and cloud_cover is float32 (scene-level
+    CLOUD_COVER). Build it once from the fetch result and hand the arrays to
+    pandas/Plotly/Arrow without re-parsing.
+    """
+
+    META_COLUMNS = ('pixel_count', 'cloud_cover')
+
+    def __init__(self, dates, values, pixel_count=None, cloud_cover=None, region_name=None):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        n = len(self.dates)
+        self.values = {name: np.asarray(column, dtype=np.float32) for name, column in values.items()}
+        self.pixel_count = (np.zeros(n, dtype=np.int32) if pixel_count is None
+                            else np.asarray(pixel_count, dtype=np.int32))
+        self.cloud_cover = (np.full(n, np.nan, dtype=np.float32) if cloud_cover is None
+                            else np.asarray(cloud_cover, dtype=np.float32))
+        self.region_name = region_name
+        for name, column in self.values.items():
+            if len(column) != n:
+                raise ValueError(f"Column '{name}' has {len(column)} values for {n} dates")
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        """Memory held by the column arrays."""
+        return (self.dates.nbytes + self.pixel_count.nbytes + self.cloud_cover.nbytes
+                + sum(column.nbytes for column in self.values.values()))
+
+    @property
+    def indices(self):
+        return list(self.values.keys())
+
+    @classmethod
+    def from_feature_info(cls, collection_info, indices, region_name=None):
+        """Build the series from a getInfo() FeatureCollection dict, sorted by date."""
+        features = collection_info.get('features', [])
+        n = len(features)
+        dates = np.empty(n, dtype='datetime64[ns]')
+        values = {name: np.full(n, np.nan, dtype=np.float32) for name in indices}
+        pixel_count = np.zeros(n, dtype=np.int32)
+        cloud_cover = np.full(n, np.nan, dtype=np.float32)
+
+        for i, feature in enumerate(features):
+            props = feature['properties']
+            dates[i] = np.datetime64(props['date'], 'ns')
+            for name in indices:
+                value = props.get(name)
+                if value is not None:
+                    values[name][i] = value
+            pixel_count[i] = props.get('pixel_count') or 0
+            if props.get('cloud_cover') is not None:
+                cloud_cover[i] = props['cloud_cover']
+
+        order = np.argsort(dates, kind='stable')
+        return cls(
+            dates[order],
+            {name: column[order] for name, column in values.items()},
+            pixel_count[order],
+            cloud_cover[order],
+            region_name
+        )
+
+    @classmethod
+    def from_collection(cls, ndvi_collection, indices, region_name=None):
+        """Fetch a mapped Earth Engine FeatureCollection once and build the series."""
+        info = get_info(ndvi_collection, 'ee.time_series')
+        with span('NDVISeries.build', features=len(info.get('features', []))):
+            return cls.from_feature_info(info, indices, region_name)
+
+    @classmethod
+    def concat(cls, parts, indices=None, region_name=None):
+        """Join series covering consecutive date ranges (e.g. streamed chunks) into one."""
+        parts = list(parts)
+        if indices is None:
+            indices = parts[0].indices if parts else []
+        if region_name is None and parts:
+            region_name = parts[0].region_name
+        return cls(
+            np.concatenate([p.dates for p in parts]) if parts else [],
+            {name: np.concatenate([p.values[name] for p in parts]) if parts else [] for name in indices},
+            np.concatenate([p.pixel_count for p in parts]) if parts else None,
+            np.concatenate([p.cloud_cover for p in parts]) if parts else None,
+            region_name
+        )
+
+    def dropna(self, index='NDVI'):
+        """Return a series without scenes whose `index` value is missing."""
+        keep = ~np.isnan(self.values[index])
+        if keep.all():
+            return self
+        return self._take(keep)
+
+    def _take(self, selector):
+        return NDVISeries(
+            self.dates[selector],
+            {name: column[selector] for name, column in self.values.items()},
+            self.pixel_count[selector],
+            self.cloud_cover[selector],
+            self.region_name
+        )
+
+    def to_pandas(self):
+        """DataFrame view of the columns (no copy of the numeric arrays)."""
+        data = {'date': self.dates, **self.values,
+                'pixel_count': self.pixel_count, 'cloud_cover': self.cloud_cover}
+        return pd.DataFrame(data, copy=False)
+
+    @classmethod
+    def from_pandas(cls, df, region_name=None):
+        indices = [c for c in df.columns if c not in ('date',) + cls.META_COLUMNS]
+        return cls(
+            df['date'].to_numpy(dtype='datetime64[ns]'),
+            {name: df[name].to_numpy() for name in indices},
+            df['pixel_count'].to_numpy() if 'pixel_count' in df else None,
+            df['cloud_cover'].to_numpy() if 'cloud_cover' in df else None,
+            region_name
+        )
+
+    def to_arrow(self):
+        """Arrow table with the region name stored in the schema metadata."""
+        pa, _ = _require_pyarrow()
+        columns = {'date': pa.array(self.dates, type=pa.timestamp('ns'))}
+        for name, column in self.values.items():
+            columns[name] = pa.array(column, type=pa.float32())
+        columns['pixel_count'] = pa.array(self.pixel_count, type=pa.int32())
+        columns['cloud_cover'] = pa.array(self.cloud_cover, type=pa.float32())
+        table = pa.table(columns)
+        if self.region_name:
+            table = table.replace_schema_metadata({'region_name': self.region_name})
+        return table
+
+    @classmethod
+    def from_arrow(cls, table):
+        metadata = table.schema.metadata or {}
+        region_name = metadata.get(b'region_name')
+        indices = [c for c in table.column_names if c not in ('date',) + cls.META_COLUMNS]
+
+        def column(name):
+            return table.column(name).to_numpy()
+
+        return cls(
+            column('date'),
+            {name: column(name) for name in indices},
+            column('pixel_count') if 'pixel_count' in table.column_names else None,
+            column('cloud_cover') if 'cloud_cover' in table.column_names else None,
+            region_name.decode('utf-8') if region_name else None
+        )
+
+    def to_parquet(self, path):
+        """Write the series to a Parquet file."""
+        _, pq = _require_pyarrow()
+        pq.write_table(self.to_arrow(), path)
+
+    @classmethod
+    def from_parquet(cls, path):
+        _, pq = _require_pyarrow()
+        return cls.from_arrow(pq.read_table(path))
+
+    def to_ipc_bytes(self):
+        """Serialize to the Arrow IPC stream format for exchange between workers."""
+        pa, _ = _require_pyarrow()
+        table = self.to_arrow()
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    @classmethod
+    def from_ipc_bytes(cls, data):
+        pa, _ = _require_pyarrow()
+        with pa.ipc.open_stream(io.BytesIO(data)) as reader:
+            return cls.from_arrow(reader.read_all())
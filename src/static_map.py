@@ -0,0 +1,195 @@
+"""
+Static NDVI map images for reports, thumbnails and API responses.
+
+Values are colorized with a 256-entry palette lookup table (one numpy
+indexing operation for the whole image). A legend and the region bounds
+are drawn with Pillow, so no browser or tile server is needed. Earth
+Engine images are fetched once as an 8-bit grayscale thumbnail stretched
+between the vis min and max. The palette is applied locally, so changing
+colors does not re-fetch anything. Rendered maps and thumbnails are cached
+in the shared ResultStore.
+"""
+import hashlib
+import io
+import json
+from functools import lru_cache
+
+import ee
+import numpy as np
+import requests
+
+from src.governor import get_governor
+from src.result_store import get_result_store
+from src.tracing import span, traced
+
+NDVI_VIS = {
+    'min': -1,
+    'max': 1,
+    'palette': ['brown', 'red', 'yellow', 'lightgreen', 'green']
+}
+DEFAULT_DIMENSIONS = 768
+LUT_SIZE = 256
+# zlib level for the output PNG; the default (6) spends most of the render time compressing
+PNG_COMPRESS_LEVEL = 1
+
+_MARGIN = 40
+_LEGEND_WIDTH = 90
+_TITLE_HEIGHT = 30
+
+
+def _require_pillow():
+    try:
+        from PIL import Image, ImageDraw, ImageFont, ImageColor
+    except ImportError:
+        raise ImportError("Pillow is required for static maps: pip install pillow")
+    return Image, ImageDraw, ImageFont, ImageColor
+
+
+def _parse_color(color):
+    """CSS color name, '#rrggbb' or Earth Engine style 'rrggbb' to an (r, g, b) tuple."""
+    _, _, _, ImageColor = _require_pillow()
+    if not color.startswith('#') and len(color) in (3, 6) and all(c in '0123456789abcdefABCDEF' for c in color):
+        color = '#' + color
+    return ImageColor.getrgb(color)[:3]
+
+
+@lru_cache(maxsize=32)
+def build_lut(palette, size=LUT_SIZE):
+    """(size, 3) uint8 lookup table interpolated evenly through the palette colors."""
+    stops = np.array([_parse_color(c) for c in palette], dtype=np.float64)
+    positions = np.linspace(0, 1, len(stops))
+    samples = np.linspace(0, 1, size)
+    return np.stack([np.interp(samples, positions, stops[:, i]) for i in range(3)], axis=1).round().astype(np.uint8)
+
+
+def colorize(values, vis_params=NDVI_VIS):
+    """RGBA uint8 image for a float array; NaN pixels are transparent."""
+    values = np.asarray(values, dtype=np.float32)
+    vmin, vmax = float(vis_params['min']), float(vis_params['max'])
+    scaled = (np.nan_to_num(values, nan=vmin) - vmin) * ((LUT_SIZE - 1) / (vmax - vmin))
+    index = np.clip(scaled, 0, LUT_SIZE - 1).astype(np.uint8)
+    alpha = np.where(np.isnan(values), 0, 255).astype(np.uint8)
+    return colorize_indices(index, alpha, vis_params['palette'])
+
+
+def colorize_indices(index, alpha, palette):
+    """RGBA image from 8-bit palette indices (e.g. a server-stretched grayscale thumbnail) and alpha."""
+    lut = build_lut(tuple(palette))
+    return np.dstack([lut[index], alpha])
+
+
+def compose(rgba, bounds, vis_params=NDVI_VIS, title=None, label='NDVI'):
+    """
+    Lay out a colorized image with a title, bounds labels and a color
+    legend. bounds is (west, south, east, north). Returns PNG bytes.
+    """
+    Image, ImageDraw, ImageFont, _ = _require_pillow()
+    height, width = rgba.shape[:2]
+    top = _MARGIN + (_TITLE_HEIGHT if title else 0)
+    canvas = Image.new('RGB', (width + 2 * _MARGIN + _LEGEND_WIDTH, height + top + _MARGIN), 'white')
+    draw = ImageDraw.Draw(canvas)
+    font = ImageFont.load_default()
+
+    map_image = Image.fromarray(rgba)
+    canvas.paste(map_image, (_MARGIN, top), map_image)
+    draw.rectangle([_MARGIN - 1, top - 1, _MARGIN + width, top + height], outline='black')
+    if title:
+        draw.text((_MARGIN, _MARGIN // 2), title, fill='black', font=font)
+
+    west, south, east, north = bounds
+    draw.text((_MARGIN, top + height + 4), f"{west:.4f}°", fill='black', font=font)
+    draw.text((_MARGIN + width, top + height + 4), f"{east:.4f}°", fill='black', font=font, anchor='ra')
+    draw.text((4, top), f"{north:.4f}°", fill='black', font=font)
+    draw.text((4, top + height), f"{south:.4f}°", fill='black', font=font, anchor='ld')
+
+    # Legend: a vertical color ramp with min / mid / max labels, max at the top
+    lut = build_lut(tuple(vis_params['palette']))
+    bar_left = _MARGIN * 2 + width
+    bar_height = max(height // 2, 100)
+    ramp = np.repeat(lut[::-1][np.linspace(0, LUT_SIZE - 1, bar_height).astype(int)][:, None, :], 16, axis=1)
+    canvas.paste(Image.fromarray(ramp), (bar_left, top))
+    draw.rectangle([bar_left - 1, top - 1, bar_left + 16, top + bar_height], outline='black')
+    vmin, vmax = float(vis_params['min']), float(vis_params['max'])
+    for fraction in (0.0, 0.5, 1.0):
+        y = top + int((1 - fraction) * (bar_height - 1))
+        draw.text((bar_left + 22, y), f"{vmin + fraction * (vmax - vmin):.2f}", fill='black', font=font, anchor='lm')
+    draw.text((bar_left, top + bar_height + 6), label, fill='black', font=font)
+
+    buffer = io.BytesIO()
+    canvas.save(buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+
+@traced('static_map.render_array')
+def render_array(values, bounds, vis_params=NDVI_VIS, title=None):
+    """PNG bytes for a north-up NDVI array covering bounds (west, south, east, north)."""
+    return compose(colorize(values, vis_params), bounds, vis_params, title)
+
+
+def _image_key(image):
+    """Stable identity for an Earth Engine image from its serialized expression graph."""
+    serialize = getattr(image, 'serialize', None)
+    if serialize is None:
+        return None
+    return hashlib.sha1(serialize().encode('utf-8')).hexdigest()
+
+
+def fetch_thumbnail(image, region, bounds, vis_params, dimensions):
+    """Grayscale thumbnail of a single-band image stretched to 0..255, as (index, alpha) arrays."""
+    Image, _, _, _ = _require_pillow()
+    params = {
+        'region': ee.Geometry.Rectangle(list(bounds)),
+        'dimensions': dimensions,
+        'min': vis_params['min'],
+        'max': vis_params['max'],
+        'format': 'png'
+    }
+    governor = get_governor('earthengine')
+
+    def download(url):
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        return response
+
+    with span('ee.getThumbURL'):
+        url = governor.call(image.clip(region).getThumbURL, params)
+    with span('http.thumbnail') as record:
+        response = governor.call(download, url)
+        record['attrs']['bytes'] = len(response.content)
+    thumbnail = Image.open(io.BytesIO(response.content)).convert('LA')
+    data = np.asarray(thumbnail)
+    return data[:, :, 0], data[:, :, 1]
+
+
+@traced('static_map.render_image')
+def render_image(image, region, bounds, vis_params=NDVI_VIS, dimensions=DEFAULT_DIMENSIONS, title=None,
+                 cache_key=None, store=None):
+    """
+    PNG bytes for a single-band Earth Engine image. cache_key identifies the
+    image (e.g. the analysis result key); without one, the image's
+    serialized graph is used when available. Thumbnails are cached per
+    image, stretch and size, and rendered maps also per palette and title.
+    """
+    try:
+        store = store if store is not None else get_result_store()
+        image_id = cache_key or _image_key(image)
+        stretch = json.dumps([vis_params['min'], vis_params['max'], list(bounds), dimensions])
+
+        def thumbnail():
+            return fetch_thumbnail(image, region, bounds, vis_params, dimensions)
+
+        def render():
+            if image_id is None:
+                index, alpha = thumbnail()
+            else:
+                index, alpha = store.get_or_compute(f"thumbnail:{image_id}:{stretch}", thumbnail)
+            with span('static_map.compose'):
+                return compose(colorize_indices(index, alpha, vis_params['palette']), bounds, vis_params, title)
+
+        if image_id is None:
+            return render()
+        return store.get_or_compute(
+            f"static_map:{image_id}:{stretch}:{json.dumps(vis_params['palette'])}:{title}", render)
+    except Exception as e:
+        print(f"Error rendering static map: {str(e)}")
+        raise
@@ -0,0 +1,380 @@
+"""
+Grid-aligned spatial tiling.
+
+An AOI is decomposed into Web-Mercator quadkey cells: whole tiles inside
+the AOI at the coarsest level that fits, and thin clipped slivers along its
+boundary. Per-cell series are computed and cached independently of the AOI
+that asked for them, so overlapping regions reuse each other's work and
+only uncached cells are sent to Earth Engine. Region results are composed
+from cell results with pixel-count-weighted aggregation.
+"""
+import contextvars
+import hashlib
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import ee
+import numpy as np
+import pandas as pd
+from shapely.geometry import box, mapping
+from shapely.prepared import prep
+
+from src.aoi import region_geometry
+from src.ndvi_processor import DEFAULT_MAX_WORKERS, split_date_range
+from src.result_store import get_result_store, result_key
+from src.series import NDVISeries
+from src.tracing import get_info, get_tracer, span, traced
+
+DEFAULT_ZOOM = 14
+# Boundary tiles are split this many levels below the coarsest zoom before clipping
+EDGE_LEVELS = 2
+# Earth Engine refuses getInfo results over 5000 elements; (cell, scene) features per request
+MAX_FEATURES_PER_REQUEST = 4000
+# Outputs of the per-cell mean + stdDev + count reducer
+_REDUCER_OUTPUTS = ('mean', 'stdDev', 'count')
+
+
+def tile_for(lon, lat, zoom):
+    """Web-Mercator tile (x, y) containing a point."""
+    lat = max(min(lat, 85.05112878), -85.05112878)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x, y, zoom):
+    """(west, south, east, north) of a tile in degrees."""
+    n = 2 ** zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def quadkey(x, y, zoom):
+    """Bing-style quadkey; a cell's parent is its quadkey minus the last digit."""
+    digits = []
+    for i in range(zoom, 0, -1):
+        mask = 1 << (i - 1)
+        digit = (1 if x & mask else 0) + (2 if y & mask else 0)
+        digits.append(str(digit))
+    return ''.join(digits)
+
+
+def tile_from_quadkey(key):
+    """Inverse of quadkey(): returns (x, y, zoom)."""
+    x = y = 0
+    zoom = len(key)
+    for i, digit in enumerate(key):
+        mask = 1 << (zoom - i - 1)
+        if digit in '13':
+            x |= mask
+        if digit in '23':
+            y |= mask
+    return x, y, zoom
+
+
+class Cell:
+    __slots__ = ('quadkey', 'geometry', 'full', 'key')
+
+    def __init__(self, quadkey_, geometry, full):
+        self.quadkey = quadkey_
+        self.geometry = geometry
+        self.full = full
+        # Full cells are shared by every AOI that covers them; edge cells are
+        # keyed by their clipped shape as well
+        if full:
+            self.key = quadkey_
+        else:
+            self.key = f"{quadkey_}:{hashlib.sha1(geometry.wkb).hexdigest()[:12]}"
+
+    def children(self):
+        """The four full cells one level down (only meaningful for a full cell)."""
+        return [Cell(key, box(*tile_bounds(*tile_from_quadkey(key))), True)
+                for key in (self.quadkey + digit for digit in '0123')]
+
+
+def cover_region(region, zoom=DEFAULT_ZOOM, max_zoom=None):
+    """
+    Decompose a config region into grid cells. Tiles inside the AOI are kept
+    whole at the coarsest level from zoom down; boundary tiles are split down
+    to max_zoom (default zoom + EDGE_LEVELS) and only those are clipped.
+    """
+    aoi = region_geometry(region)
+    prepared = prep(aoi)
+    max_zoom = zoom + EDGE_LEVELS if max_zoom is None else max(max_zoom, zoom)
+    cells = []
+
+    def visit(x, y, z):
+        tile = box(*tile_bounds(x, y, z))
+        if not prepared.intersects(tile):
+            return
+        if prepared.contains(tile):
+            cells.append(Cell(quadkey(x, y, z), tile, True))
+            return
+        if z < max_zoom:
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    visit(2 * x + dx, 2 * y + dy, z + 1)
+            return
+        clipped = tile.intersection(aoi)
+        if clipped.is_empty or clipped.geom_type not in ('Polygon', 'MultiPolygon'):
+            return
+        cells.append(Cell(quadkey(x, y, z), clipped, False))
+
+    west, south, east, north = aoi.bounds
+    x0, y0 = tile_for(west, north, zoom)
+    x1, y1 = tile_for(east, south, zoom)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            visit(x, y, zoom)
+    return cells
+
+
+def _frame_columns(indices):
+    return ['date', 'count', 'cloud_cover'] + [f"{name}_{stat}" for name in indices for stat in ('mean', 'stdDev')]
+
+
+def _pooled(cell_frames, indices):
+    """Per-date pixel totals, weighted means and pooled stdDevs over several cell tables."""
+    df = pd.concat(cell_frames, ignore_index=True)
+    n = df['count'].to_numpy(dtype=np.float64)
+    work = pd.DataFrame({'date': df['date'], 'n': n, 'cloud_cover': df['cloud_cover']})
+    for name in indices:
+        mean = df[f"{name}_mean"].to_numpy(dtype=np.float64)
+        std = df[f"{name}_stdDev"].to_numpy(dtype=np.float64)
+        valid = n > 0
+        work[f"{name}_w"] = np.where(valid, n * np.nan_to_num(mean), 0.0)
+        work[f"{name}_sq"] = np.where(valid, n * (np.nan_to_num(std) ** 2 + np.nan_to_num(mean) ** 2), 0.0)
+    grouped = work.groupby('date', sort=True)
+    sums = grouped.sum(numeric_only=True)
+    total = sums['n'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = {name: np.where(total > 0, sums[f"{name}_w"].to_numpy() / total, np.nan) for name in indices}
+        stds = {
+            name: np.sqrt(np.maximum(np.where(total > 0, sums[f"{name}_sq"].to_numpy() / total, np.nan)
+                                     - values[name] ** 2, 0))
+            for name in indices
+        }
+    return sums.index.to_numpy(dtype='datetime64[ns]'), total, values, stds, grouped['cloud_cover'].max().to_numpy()
+
+
+def merge_cell_frames(cell_frames, indices):
+    """Combine cell tables into the table of the area they cover, e.g. four children into their parent."""
+    frames = [f for f in cell_frames if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=_frame_columns(indices))
+    dates, total, values, stds, cloud_cover = _pooled(frames, indices)
+    merged = pd.DataFrame({'date': dates, 'count': total, 'cloud_cover': cloud_cover})
+    for name in indices:
+        merged[f"{name}_mean"] = values[name]
+        merged[f"{name}_stdDev"] = stds[name]
+    return merged
+
+
+def compose_series(cell_frames, indices, region_name=None):
+    """
+    Combine per-cell long tables (date, count, <index>_mean, <index>_stdDev,
+    cloud_cover) into one region series, weighting each cell by pixel count.
+    """
+    frames = [f for f in cell_frames if len(f)]
+    if not frames:
+        empty = NDVISeries([], {name: [] for name in indices}, region_name=region_name)
+        return empty, {name: np.empty(0) for name in indices}
+    dates, total, values, stds, cloud_cover = _pooled(frames, indices)
+    series = NDVISeries(dates, values, total.astype(np.int32), cloud_cover, region_name)
+    return series, stds
+
+
+def _to_fetch(plan):
+    """Cells a TiledProcessor plan still has to fetch."""
+    cell, parts = plan
+    if parts is None:
+        return [cell]
+    if isinstance(parts, list):
+        return [c for part in parts for c in _to_fetch(part)]
+    return []
+
+
+class TiledProcessor:
+    def __init__(self, data_fetcher, zoom=DEFAULT_ZOOM, store=None, max_zoom=None):
+        """Compute region series and stats from cached grid cells."""
+        self.data_fetcher = data_fetcher
+        self.config = data_fetcher.config
+        self.zoom = zoom
+        self.max_zoom = zoom + EDGE_LEVELS if max_zoom is None else max(max_zoom, zoom)
+        self.store = store if store is not None else get_result_store()
+
+    def _cell_cache_key(self, cell, start_date, end_date, indices):
+        # Region-independent: only the cell and the result-affecting settings matter
+        settings = {k: v for k, v in self.config.items() if k not in ('region', 'date_range', 'profile')}
+        return result_key('cell_series', settings, cell=cell.key, start_date=start_date,
+                          end_date=end_date, indices=indices)
+
+    def _fetch_batch(self, start_date, end_date, cells, indices):
+        """Reduce a batch of cells for every scene in one date window; return the feature properties."""
+        cells_fc = ee.FeatureCollection([
+            ee.Feature(ee.Geometry(mapping(cell.geometry), None, False), {'cell': cell.key})
+            for cell in cells
+        ])
+        collection = self.data_fetcher.build_collection(start_date, end_date)
+        reducer = ee.Reducer.mean() \
+            .combine(reducer2=ee.Reducer.stdDev(), sharedInputs=True) \
+            .combine(reducer2=ee.Reducer.count(), sharedInputs=True)
+
+        def per_image(image):
+            index_image = self.data_fetcher.calculate_indices(image, indices)
+            date = ee.Date(image.get('system:time_start')).format('YYYY-MM-dd')
+            cloud_cover = image.get('CLOUD_COVER')
+            reduced = index_image.reduceRegions(collection=cells_fc, reducer=reducer, scale=30)
+            return reduced.map(lambda f: f.set({'date': date, 'cloud_cover': cloud_cover}))
+
+        info = get_info(collection.map(per_image).flatten(), 'ee.cell_series')
+        return [f['properties'] for f in info.get('features', [])]
+
+    def _fetch_cells(self, cells, start_date, end_date, indices, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Reduce uncached cells for every scene; return {cell key: DataFrame}.
+
+        The date range is split into split_date_range windows and each window's
+        cells into batches of at most MAX_FEATURES_PER_REQUEST (cell, scene)
+        features, with at most max_workers requests in flight.
+        """
+        windows = split_date_range(start_date, end_date)
+        scene_counts = get_info(
+            ee.List([self.data_fetcher.build_collection(start, end).size() for start, end in windows]),
+            'ee.window_sizes'
+        )
+        if not sum(scene_counts):
+            raise ValueError("No satellite images found for the selected region and time period. "
+                             "Try adjusting the date range or cloud cover threshold.")
+        batches = []
+        for (start, end), scenes in zip(windows, scene_counts):
+            if not scenes:
+                continue
+            size = max(1, MAX_FEATURES_PER_REQUEST // scenes)
+            batches.extend((start, end, cells[i:i + size]) for i in range(0, len(cells), size))
+
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Run in a copy of this context so spans land on the caller's tracer
+            futures = [pool.submit(contextvars.copy_context().run, self._fetch_batch, start, end, batch, indices)
+                       for start, end, batch in batches]
+            rows = [row for future in futures for row in future.result()]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        with span('tiling.parse', rows=len(rows), requests=len(batches)):
+            if len(indices) == 1:
+                # reduceRegions names a single-band image's outputs after the reducer
+                # alone ('mean', 'stdDev', 'count'), without the band prefix
+                rows = [{(f"{indices[0]}_{key}" if key in _REDUCER_OUTPUTS else key): value
+                         for key, value in r.items()} for r in rows]
+            columns = _frame_columns(indices)
+            df = pd.DataFrame({
+                'cell': [r.get('cell') for r in rows],
+                'date': pd.to_datetime([r.get('date') for r in rows]),
+                'count': [r.get('NDVI_count') or 0 for r in rows],
+                'cloud_cover': [r.get('cloud_cover') for r in rows],
+                **{col: [r.get(col) for r in rows] for col in columns[3:]}
+            }, columns=['cell'] + columns)
+            df[columns[1:]] = df[columns[1:]].apply(pd.to_numeric, errors='coerce')
+            frames = {key: frame.drop(columns='cell').reset_index(drop=True)
+                      for key, frame in df.groupby('cell', sort=False)}
+        return {cell.key: frames.get(cell.key, df.iloc[0:0].drop(columns='cell')) for cell in cells}
+
+    def _plan(self, cell, key_for):
+        """
+        (cell, frame) if the cell is cached; (cell, [child plans]) if it is a
+        full cell with some cached descendants; (cell, None) to fetch it.
+        """
+        key = key_for(cell)
+        frame = self.store.get(key) if key in self.store else None
+        if frame is not None:
+            return cell, frame
+        if cell.full and len(cell.quadkey) < self.max_zoom:
+            parts = [self._plan(child, key_for) for child in cell.children()]
+            if any(part[1] is not None for part in parts):
+                return cell, parts
+        return cell, None
+
+    def _assemble(self, plan, fetched, key_for, indices):
+        """Build a planned cell's frame, caching fetched cells and parents composed from children."""
+        cell, parts = plan
+        if isinstance(parts, pd.DataFrame):
+            return parts
+        if parts is None:
+            frame = fetched[cell.key]
+        else:
+            frame = merge_cell_frames([self._assemble(part, fetched, key_for, indices) for part in parts], indices)
+        return self.store.put(key_for(cell), frame)
+
+    @traced('TiledProcessor.get_cell_frames')
+    def get_cell_frames(self, start_date, end_date):
+        """Per-cell tables for the region, computing only cells missing from the cache."""
+        indices = self.data_fetcher.get_index_types()
+        cells = cover_region(self.config['region'], self.zoom, self.max_zoom)
+
+        def key_for(cell):
+            return self._cell_cache_key(cell, start_date, end_date, indices)
+
+        plans = []
+        missing = []
+        for cell in cells:
+            plan = self._plan(cell, key_for)
+            pending = _to_fetch(plan)
+            get_tracer().record_cache('tile', not pending)
+            plans.append(plan)
+            missing.extend(pending)
+        fetched = self._fetch_cells(missing, start_date, end_date, indices) if missing else {}
+        return [self._assemble(plan, fetched, key_for, indices) for plan in plans], indices
+
+    def _dates(self, start_date, end_date):
+        return (start_date or self.config['date_range']['start_date'],
+                end_date or self.config['date_range']['end_date'])
+
+    @staticmethod
+    def _latest_statistics(series, stds, indices):
+        """Mean and stdDev of every index for the most recent scene with valid pixels."""
+        valid = np.flatnonzero(series.pixel_count > 0)
+        if len(valid) == 0:
+            return {}
+        last = valid[-1]
+        stats = {}
+        for name in indices:
+            stats[f"{name}_mean"] = float(series.values[name][last])
+            stats[f"{name}_stdDev"] = float(stds[name][last])
+        return stats
+
+    def get_time_series(self, start_date=None, end_date=None):
+        """Region NDVISeries composed from cell series."""
+        try:
+            frames, indices = self.get_cell_frames(*self._dates(start_date, end_date))
+            series, _ = compose_series(frames, indices, self.config['region'].get('name'))
+            return series
+        except Exception as e:
+            print(f"Error processing tiled time series: {str(e)}")
+            raise
+
+    def get_statistics(self, start_date=None, end_date=None):
+        """Mean and stdDev of every index for the most recent scene, composed from cells."""
+        try:
+            frames, indices = self.get_cell_frames(*self._dates(start_date, end_date))
+            series, stds = compose_series(frames, indices)
+            return self._latest_statistics(series, stds, indices)
+        except Exception as e:
+            print(f"Error calculating tiled statistics: {str(e)}")
+            raise
+
+    def get_series_and_statistics(self, start_date=None, end_date=None):
+        """(series, stats) for one date window from a single pass over the cell frames."""
+        try:
+            frames, indices = self.get_cell_frames(*self._dates(start_date, end_date))
+            series, stds = compose_series(frames, indices, self.config['region'].get('name'))
+            return series, self._latest_statistics(series, stds, indices)
+        except Exception as e:
+            print(f"Error processing tiled region: {str(e)}")
+            raise
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+
+# Spans kept by the process-wide fallback tracer used outside start_trace()
+DEFAULT_MAX_SPANS = 1000
+
+
+class Tracer:
+    def __init__(self, max_spans=None):
+        """Initialize an empty tracer for one Streamlit rerun or batch job; max_spans keeps only the newest."""
+        self._lock = threading.Lock()
+        self.max_spans = max_spans
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded spans and counters."""
+        with self._lock:
+            self.spans = deque(maxlen=self.max_spans)
+            self.counters = {}
+            self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time a block of code and record it as a span."""
+        record = {'name': name, 'attrs': dict(attrs)}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['attrs']['error'] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            record['start_ms'] = (start - self._origin) * 1000
+            record['duration_ms'] = (end - start) * 1000
+            record['thread'] = threading.get_ident()
+            with self._lock:
+                self.spans.append(record)
+
+    def count(self, name, value=1):
+        """Increment a named counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_cache(self, cache_name, hit):
+        """Record a cache hit or miss for the given cache."""
+        self.count(f"{cache_name}.{'hit' if hit else 'miss'}")
+
+    def summary(self):
+        """Aggregate span timings by name."""
+        with self._lock:
+            spans = list(self.spans)
+        summary = {}
+        for record in spans:
+            entry = summary.setdefault(record['name'], {
+                'name': record['name'],
+                'calls': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'bytes': 0
+            })
+            entry['calls'] += 1
+            entry['total_ms'] += record['duration_ms']
+            entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+            entry['bytes'] += record['attrs'].get('bytes', 0) or 0
+        for entry in summary.values():
+            entry['mean_ms'] = entry['total_ms'] / entry['calls']
+        return sorted(summary.values(), key=lambda e: e['total_ms'], reverse=True)
+
+    def to_jsonl(self):
+        """Serialize spans and counters as JSON lines."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        lines = [json.dumps({'type': 'span', **record}, default=str) for record in spans]
+        lines.append(json.dumps({'type': 'counters', 'counters': counters}))
+        return '\n'.join(lines) + '\n'
+
+    def to_chrome_trace(self):
+        """Serialize spans in Chrome trace event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        pid = os.getpid()
+        events = [{
+            'name': record['name'],
+            'ph': 'X',
+            'ts': record['start_ms'] * 1000,
+            'dur': record['duration_ms'] * 1000,
+            'pid': pid,
+            'tid': record['thread'],
+            'args': record['attrs']
+        } for record in spans]
+        if counters:
+            events.append({'name': 'counters', 'ph': 'C', 'ts': 0, 'pid': pid, 'args': counters})
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, default=str)
+
+    def export(self, path):
+        """Write the trace to disk; '.json' gives Chrome trace format, anything else JSON lines."""
+        data = self.to_chrome_trace() if path.endswith('.json') else self.to_jsonl()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+
+# Batch jobs that never call start_trace() record here; bounded so long runs do not grow without limit
+_default_tracer = Tracer(max_spans=DEFAULT_MAX_SPANS)
+_current_tracer = ContextVar('current_tracer', default=_default_tracer)
+
+
+def get_tracer():
+    """Return the tracer active in the current context."""
+    return _current_tracer.get()
+
+
+def start_trace():
+    """Install a fresh tracer for the current context (e.g. one Streamlit rerun) and return it."""
+    tracer = Tracer()
+    _current_tracer.set(tracer)
+    return tracer
+
+
+def span(name, **attrs):
+    """Time a block of code on the active tracer."""
+    return get_tracer().span(name, **attrs)
+
+
+def traced(name=None):
+    """Decorator that records every call of the wrapped function as a span."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def payload_size(obj):
+    """Approximate size in bytes of a response payload."""
+    if obj is None:
+        return 0
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj.encode('utf-8'))
+    try:
+        return len(json.dumps(obj, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_info(ee_object, name='ee.getInfo'):
+    """Call getInfo on an Earth Engine object inside a span that records the payload size."""
+    # Imported here: the governor records its retries on the tracer
+    from src.governor import get_governor
+    with span(name) as record:
+        info = get_governor('earthengine').call(ee_object.getInfo)
+        record['attrs']['bytes'] = payload_size(info)
+        return info
@@ -1,9 +1,12 @@
 import streamlit as st
-import requests
 import os
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
 from streamlit_folium import folium_static
-from src.ai_analysis import GeminiAnalyzer
+from src.ai_analysis import get_analyzer
+from src.geocode import google_maps_results
+from src.governor import all_metrics
 
 load_dotenv()
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -21,13 +24,7 @@ def get_place_suggestions(input_text):
         "language": "en"
     }
     try:
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code != 200:
-            return []
-        data = response.json()
-        if data.get("status") != "OK":
-            return []
-        return data.get("predictions", [])
+        return google_maps_results(url, params, 'http.places_autocomplete', key='predictions')
     except Exception as e:
         st.error(f"Error fetching place suggestions: {str(e)}")
         return []
@@ -166,13 +163,55 @@ def render_sidebar_controls():
         
         return st.session_state.selected_place, start_date, end_date, forecast_years, process
 
-def render_main_content(ndvi_map, ndvi_stats, time_series_fig, forecast_fig, ai_analysis, region_name):
+def render_chart_zoom(series):
+    """Render a date-range slider for the charts; returns (start, end) or None for the full range"""
+    if series is None or len(series) < 2:
+        return None
+    first = pd.Timestamp(series.dates[0]).date()
+    last = pd.Timestamp(series.dates[-1]).date()
+    if first == last:
+        return None
+    with st.sidebar:
+        st.markdown("### 🔍 Chart Zoom")
+        start, end = st.slider(
+            "Date range",
+            min_value=first,
+            max_value=last,
+            value=(first, last),
+            key="chart_zoom"
+        )
+    if (start, end) == (first, last):
+        return None
+    return np.datetime64(start, 'D'), np.datetime64(end, 'D') + np.timedelta64(1, 'D') - np.timedelta64(1, 'ns')
+
+def render_main_content(ndvi_map, ndvi_stats, time_series_fig, forecast_fig, ai_analysis, region_name,
+                        analysis_data=None, analysis_region=None, anomaly=None):
     st.markdown("## 📊 Results Overview")
     col1, col2, col3 = st.columns(3)
     col1.metric("NDVI Mean", f"{ndvi_stats.get('NDVI_mean', 'N/A'):.3f}" if ndvi_stats and ndvi_stats.get('NDVI_mean') is not None else "N/A")
     col2.metric("NDVI Std Dev", f"{ndvi_stats.get('NDVI_stdDev', 'N/A'):.3f}" if ndvi_stats and ndvi_stats.get('NDVI_stdDev') is not None else "N/A")
     col3.metric("Region", region_name if region_name else "N/A")
 
+    # Additional indices requested via config 'index_type'
+    extra_indices = [
+        key[:-len('_mean')] for key in (ndvi_stats or {})
+        if key.endswith('_mean') and key != 'NDVI_mean'
+    ]
+    if extra_indices:
+        cols = st.columns(len(extra_indices))
+        for col, name in zip(cols, extra_indices):
+            value = ndvi_stats.get(f"{name}_mean")
+            col.metric(f"{name} Mean", f"{value:.3f}" if value is not None else "N/A")
+
+    # Latest scene scored against the region's seasonal baseline
+    if anomaly and anomaly.get('score') is not None:
+        if anomaly['anomaly']:
+            st.warning(f"⚠️ NDVI on {anomaly['date']} is {anomaly['value']:.3f}, well below the seasonal "
+                       f"baseline of {anomaly['expected']:.3f} (anomaly score {anomaly['score']:.1f}).")
+        else:
+            st.caption(f"Latest scene ({anomaly['date']}): anomaly score {anomaly['score']:.1f} "
+                       f"against the seasonal baseline.")
+
     st.markdown("---")
     tab1, tab2, tab3 = st.tabs(["🗺️ NDVI Map", "📈 Time Series", "🔮 Forecast"])
     with tab1:
@@ -193,14 +232,11 @@ def render_main_content(ndvi_map, ndvi_stats, time_series_fig, forecast_fig, ai_
 
     st.markdown("---")
     st.markdown("## 🤖 AI-Powered Analysis")
-    if st.session_state.get('latest_ndvi') is not None and st.session_state.get('latest_config') is not None:
+    if analysis_data is not None and analysis_region is not None:
         if st.button("Generate AI Analysis", key="ai_analysis_button"):
             with st.spinner("Analyzing data with Gemini AI..."):
-                gemini_analyzer = GeminiAnalyzer()
-                analysis = gemini_analyzer.analyze_ndvi_trend(
-                    st.session_state['latest_ndvi'],
-                    st.session_state['latest_config']['region']
-                )
+                gemini_analyzer = get_analyzer()
+                analysis = gemini_analyzer.analyze_ndvi_trend(analysis_data, analysis_region)
                 if analysis['status'] == 'success':
                     st.success("Analysis Complete!")
                     st.write(analysis['analysis'])
@@ -212,3 +248,62 @@ def render_main_content(ndvi_map, ndvi_stats, time_series_fig, forecast_fig, ai_
         st.info("Run the AI analysis to see insights here.")
 
     # You can add the PDF download button here if desired
+
+def render_perf_panel(tracer):
+    """Render timings, payload sizes and cache counters recorded during this rerun"""
+    st.markdown("---")
+    with st.expander("⏱️ Performance (this rerun)", expanded=True):
+        summary = tracer.summary()
+        if summary:
+            st.dataframe(
+                [{
+                    'Stage': entry['name'],
+                    'Calls': entry['calls'],
+                    'Total (ms)': round(entry['total_ms'], 1),
+                    'Mean (ms)': round(entry['mean_ms'], 1),
+                    'Max (ms)': round(entry['max_ms'], 1),
+                    'Payload (bytes)': entry['bytes']
+                } for entry in summary],
+                use_container_width=True
+            )
+        else:
+            st.info("No spans recorded yet.")
+
+        if tracer.counters:
+            st.markdown("**Counters**")
+            st.json(tracer.counters)
+
+        governors = all_metrics()
+        if governors:
+            st.markdown("**External API governors**")
+            st.dataframe(
+                [{
+                    'Service': name,
+                    'Circuit': m['circuit'],
+                    'Calls': m['calls'],
+                    'Retries': m['retries'],
+                    'Rejected': m['rejections'],
+                    'Failures': m['failures'],
+                    'In flight': m['in_flight'],
+                    'Queued': m['queue_depth'],
+                    'Max queued': m['max_queue_depth'],
+                    'Throttled (ms)': m['throttled_ms']
+                } for name, m in governors.items()],
+                use_container_width=True
+            )
+
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "Download JSON lines",
+            data=tracer.to_jsonl(),
+            file_name="trace.jsonl",
+            mime="application/x-ndjson",
+            key="perf_download_jsonl"
+        )
+        col2.download_button(
+            "Download Chrome trace",
+            data=tracer.to_chrome_trace(),
+            file_name="trace.json",
+            mime="application/json",
+            key="perf_download_chrome"
+        )
@@ -1,12 +1,16 @@
 import folium
 import ee
 import streamlit as st
-import plotly.express as px
 import pandas as pd
 import os
 import sys
 import plotly.graph_objects as go
 from prophet import Prophet
+from src.downsample import DEFAULT_WIDTH_PX, WEBGL_THRESHOLD, decimate, slice_range
+from src.governor import get_governor
+from src.series import NDVISeries
+from src.static_map import DEFAULT_DIMENSIONS, NDVI_VIS, render_image
+from src.tracing import span, traced
 
 class Visualizer:
     def __init__(self, data_fetcher):
@@ -14,6 +18,7 @@ class Visualizer:
         self.data_fetcher = data_fetcher
         self.config = data_fetcher.config
     
+    @traced('Visualizer.create_map')
     def create_map(self, ndvi_image):
         """Create an interactive map with Folium."""
         try:
@@ -26,13 +31,8 @@ class Visualizer:
             m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
             
             # Add NDVI layer
-            ndvi_vis = {
-                'min': -1,
-                'max': 1,
-                'palette': ['brown', 'red', 'yellow', 'lightgreen', 'green']
-            }
-            
-            map_id = ndvi_image.getMapId(ndvi_vis)
+            with span('ee.getMapId'):
+                map_id = get_governor('earthengine').call(ndvi_image.getMapId, NDVI_VIS)
             folium.TileLayer(
                 tiles=map_id['tile_fetcher'].url_format,
                 attr='Google Earth Engine',
@@ -45,69 +45,116 @@ class Visualizer:
             st.error(f"Error creating map: {str(e)}")
             raise
     
-    def plot_time_series(self, ndvi_collection):
-        """Create a time series plot using Plotly."""
+    def create_static_map(self, ndvi_image, cache_key=None, dimensions=DEFAULT_DIMENSIONS):
+        """Render the NDVI image as PNG bytes with a legend and bounds (for PDFs and thumbnails)."""
+        coords = self.config['region']['coordinates']
+        bounds = (coords['west'], coords['south'], coords['east'], coords['north'])
+        return render_image(
+            ndvi_image,
+            self.data_fetcher.get_region(),
+            bounds,
+            NDVI_VIS,
+            dimensions=dimensions,
+            title=f"NDVI - {self.config['region'].get('name', '')}",
+            cache_key=cache_key
+        )
+
+    def _as_series(self, data):
+        """Accept an NDVISeries or a mapped ee.FeatureCollection and return an NDVISeries."""
+        if isinstance(data, NDVISeries):
+            return data
+        return NDVISeries.from_collection(
+            data,
+            self.data_fetcher.get_index_types(),
+            self.config['region'].get('name')
+        )
+    
+    def _line_trace(self, x, y, name, width_px):
+        """Line trace decimated to the chart width; WebGL above WEBGL_THRESHOLD points."""
+        x, y = decimate(x, y, width_px)
+        trace_type = go.Scattergl if len(y) > WEBGL_THRESHOLD else go.Scatter
+        return trace_type(x=x, y=y, mode='lines', name=name)
+    
+    @traced('Visualizer.plot_time_series')
+    def plot_time_series(self, series, x_range=None, width_px=DEFAULT_WIDTH_PX):
+        """
+        Create a time series plot using Plotly.
+
+        Points are downsampled (LTTB) to about one per pixel of width_px. Pass
+        x_range=(start, end) to zoom: the range is cut from the cached series at
+        full resolution before downsampling.
+        """
         try:
-            # Convert collection to pandas DataFrame
-            dates = []
-            values = []
-            
-            # Get the collection info
-            collection_info = ndvi_collection.getInfo()
-            
-            # Process each image in the collection
-            for feature in collection_info['features']:
-                date = feature['properties']['date']
-                value = feature['properties']['NDVI']
-                dates.append(date)
-                values.append(value)
+            series = self._as_series(series)
+            in_range = slice_range(series.dates, x_range)
+            dates = series.dates[in_range]
             
-            # Create DataFrame
-            df = pd.DataFrame({
-                'Date': dates,
-                'NDVI': values
-            })
-            
-            # Create plot
-            fig = px.line(df, x='Date', y='NDVI', title='NDVI Time Series')
+            # One line per index, straight from the columnar arrays
+            fig = go.Figure()
+            for name, values in series.values.items():
+                fig.add_trace(self._line_trace(dates, values[in_range], name, width_px))
+            title = 'NDVI Time Series' if series.indices == ['NDVI'] else 'Index Time Series'
+            fig.update_layout(title=title, xaxis_title='Date', yaxis_title='Value')
             return fig
         except Exception as e:
             st.error(f"Error creating time series plot: {str(e)}")
             raise
     
-    def plot_forecast(self, ndvi_collection, periods=60):
-        """
-        Plot NDVI time series and forecast for the next 'periods' months.
+    @traced('Visualizer.forecast')
+    def forecast(self, series, periods=60):
         """
-        try:
-            # Extract dates and NDVI values
-            dates = []
-            values = []
-            collection_info = ndvi_collection.getInfo()
-            
-            for feature in collection_info['features']:
-                if feature['properties']['NDVI'] is not None:
-                    dates.append(feature['properties']['date'])
-                    values.append(feature['properties']['NDVI'])
+        Fit Prophet on the NDVI series and predict the next 'periods' months.
 
-            # Prepare DataFrame for Prophet
-            df = pd.DataFrame({'ds': dates, 'y': values})
-            df['ds'] = pd.to_datetime(df['ds'])
+        Returns the history and future rows (ds, yhat, yhat_lower, yhat_upper);
+        cache it and pass it to plot_forecast so zoomed views don't refit.
+        """
+        series = self._as_series(series).dropna('NDVI')
+        # Prepare DataFrame for Prophet
+        df = pd.DataFrame({'ds': series.dates, 'y': series.values['NDVI']}, copy=False)
 
-            # Fit Prophet model
+        # Fit Prophet model
+        with span('prophet.fit', points=len(df)):
             model = Prophet()
             model.fit(df)
 
-            # Make future dataframe (next 5 years, monthly)
+        # Make future dataframe (monthly)
+        with span('prophet.predict', periods=periods):
             future = model.make_future_dataframe(periods=periods, freq='ME')
             forecast = model.predict(future)
+        return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+    @traced('Visualizer.plot_forecast')
+    def plot_forecast(self, series, periods=60, x_range=None, width_px=DEFAULT_WIDTH_PX, forecast=None):
+        """
+        Plot NDVI time series and forecast for the next 'periods' months.
+
+        The model is fitted on the full series; only the plotted traces are
+        limited to x_range and downsampled to width_px. A range that ends at
+        the last observation still shows the whole future forecast. Pass `forecast` (rows
+        of a src.forecasting.forecast_batch table, or any frame with ds and
+        yhat) to plot a precomputed forecast instead of fitting Prophet.
+        """
+        try:
+            series = self._as_series(series).dropna('NDVI')
+
+            if forecast is None:
+                forecast = self.forecast(series, periods)
 
             # Plot
             fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df['ds'], y=df['y'], mode='lines', name='Historical NDVI'))
-            fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], mode='lines', name='Forecast NDVI'))
+            history_mask = slice_range(series.dates, x_range)
+            forecast_dates = forecast['ds'].to_numpy()
+            forecast_range = x_range
+            if x_range is not None and len(series) and len(forecast_dates) and x_range[1] >= series.dates[-1]:
+                # The zoom slider stops at the last observation; a range that reaches it keeps the future part
+                forecast_range = (x_range[0], max(x_range[1], forecast_dates[-1]))
+            forecast_mask = slice_range(forecast_dates, forecast_range)
+            fig.add_trace(self._line_trace(
+                series.dates[history_mask], series.values['NDVI'][history_mask], 'Historical NDVI', width_px))
+            fig.add_trace(self._line_trace(
+                forecast_dates[forecast_mask], forecast['yhat'].to_numpy()[forecast_mask], 'Forecast NDVI', width_px))
             fig.update_layout(title='NDVI Forecast (Past & Next 5 Years)', xaxis_title='Date', yaxis_title='NDVI')
             return fig
         except Exception as e:
             print(f"Error in forecast plotting: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
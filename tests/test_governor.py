@@ -0,0 +1,178 @@
+import time
+
+import pytest
+import requests
+
+from src.governor import CircuitBreaker, GovernorRejected, RetryableError, ServiceGovernor, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def http_error(status_code, headers=None):
+    return requests.HTTPError(f"{status_code} error", response=FakeResponse(status_code, headers))
+
+
+def make_governor(**limits):
+    settings = {'max_concurrent': 2, 'rate_per_sec': 1000.0, 'burst': 1000, 'max_retries': 2,
+                'base_delay': 0.001, 'max_delay': 0.01, 'failure_threshold': 2, 'reset_timeout': 0.05,
+                'queue_timeout': 1.0}
+    settings.update(limits)
+    return ServiceGovernor('test', **settings)
+
+
+def open_breaker(governor):
+    def fail():
+        raise http_error(503)
+    with pytest.raises(requests.HTTPError):
+        governor.call(fail)
+    assert governor.breaker.state == CircuitBreaker.OPEN
+
+
+def test_token_bucket_allows_burst_then_waits_for_rate():
+    bucket = TokenBucket(rate_per_sec=20.0, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    start = time.monotonic()
+    waited = bucket.acquire()
+    assert waited > 0
+    assert time.monotonic() - start >= 0.04
+
+
+def test_token_bucket_times_out():
+    bucket = TokenBucket(rate_per_sec=1.0, burst=1)
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire(timeout=0.01) is None
+
+
+def test_breaker_opens_after_threshold_and_allows_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_released_probe_can_be_retaken():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+def test_retries_retryable_errors_then_succeeds():
+    governor = make_governor(failure_threshold=10)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise http_error(429)
+        return 'ok'
+
+    assert governor.call(flaky) == 'ok'
+    metrics = governor.metrics()
+    assert metrics['retries'] == 2
+    assert metrics['successes'] == 1
+    assert metrics['circuit'] == CircuitBreaker.CLOSED
+
+
+def test_does_not_retry_caller_errors():
+    governor = make_governor()
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise http_error(400)
+
+    with pytest.raises(requests.HTTPError):
+        governor.call(bad_request)
+    assert len(calls) == 1
+    assert governor.metrics()['failures'] == 1
+
+
+def test_retryable_error_is_raised_after_max_retries():
+    governor = make_governor(max_retries=1, failure_threshold=10)
+
+    def quota():
+        raise RetryableError("OVER_QUERY_LIMIT")
+
+    with pytest.raises(RetryableError):
+        governor.call(quota)
+    assert governor.metrics()['retries'] == 1
+
+
+def test_open_circuit_rejects_without_calling():
+    governor = make_governor(reset_timeout=10.0)
+    open_breaker(governor)
+    calls = []
+    with pytest.raises(GovernorRejected):
+        governor.call(lambda: calls.append(1))
+    assert calls == []
+    assert governor.metrics()['rejections'] == 1
+
+
+def test_probe_with_caller_error_closes_circuit():
+    governor = make_governor()
+    open_breaker(governor)
+    time.sleep(0.06)
+
+    def bad_request():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        governor.call(bad_request)
+    assert governor.breaker.state == CircuitBreaker.CLOSED
+    assert governor.call(lambda: 'ok') == 'ok'
+
+
+def test_rejected_probe_frees_the_probe_slot():
+    governor = make_governor(queue_timeout=0.01)
+    open_breaker(governor)
+    time.sleep(0.06)
+
+    # With an empty bucket the probe times out waiting for a token and never reaches the service
+    governor.bucket = TokenBucket(rate_per_sec=0.001, burst=1)
+    governor.bucket.acquire()
+    with pytest.raises(GovernorRejected):
+        governor.call(lambda: 'ok')
+    assert governor.breaker.state == CircuitBreaker.HALF_OPEN
+    assert governor.breaker.allow()
+
+
+def test_retry_after_header_sets_minimum_delay():
+    governor = make_governor(max_delay=0.2)
+    calls = []
+
+    def throttled():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise http_error(429, {'Retry-After': '0.1'})
+        return 'ok'
+
+    assert governor.call(throttled) == 'ok'
+    assert calls[1] - calls[0] >= 0.1
@@ -0,0 +1,146 @@
+import pandas as pd
+import pytest
+from shapely.geometry import box
+
+from src import tiling
+from src.result_store import ResultStore
+from src.tiling import MAX_FEATURES_PER_REQUEST, TiledProcessor, cover_region, merge_cell_frames
+
+
+class FakeCollection:
+    def __init__(self, scenes):
+        self.scenes = scenes
+
+    def size(self):
+        return self.scenes
+
+
+class FakeFetcher:
+    def __init__(self, region, scenes_per_window=12):
+        self.config = {
+            'region': region,
+            'date_range': {'start_date': '2024-01-01', 'end_date': '2024-12-31'},
+            'satellite': 'LANDSAT/LC08/C02/T1_TOA',
+            'cloud_cover_threshold': 20,
+            'index_type': 'NDVI'
+        }
+        self.scenes_per_window = scenes_per_window
+
+    def get_index_types(self):
+        return ['NDVI']
+
+    def build_collection(self, start_date=None, end_date=None):
+        return FakeCollection(self.scenes_per_window)
+
+
+def region(lat, lon, half=0.05):
+    return {'name': 'test', 'coordinates': {'north': lat + half, 'south': lat - half,
+                                            'east': lon + half, 'west': lon - half}}
+
+
+def cell_frame(cell):
+    # One scene; the pixel count follows the cell's area so composed parents stay consistent
+    return pd.DataFrame({'date': pd.to_datetime(['2024-01-05']), 'count': [cell.geometry.area * 1e9],
+                         'cloud_cover': [5.0], 'NDVI_mean': [0.5], 'NDVI_stdDev': [0.1]})
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Replace Earth Engine fetches with synthetic frames and record the cells requested."""
+    calls = []
+
+    def fetch_cells(self, cells, start_date, end_date, indices):
+        calls.append(list(cells))
+        return {cell.key: cell_frame(cell) for cell in cells}
+
+    monkeypatch.setattr(TiledProcessor, '_fetch_cells', fetch_cells)
+    return calls
+
+
+def test_cover_region_keeps_interior_tiles_whole():
+    aoi = region(26.9, 75.1)
+    cells = cover_region(aoi, zoom=14)
+    assert any(len(cell.quadkey) == 14 for cell in cells if cell.full)
+    # Only boundary cells are clipped, and only at the finest level
+    assert all(len(cell.quadkey) == 14 + tiling.EDGE_LEVELS for cell in cells if not cell.full)
+    area = sum(cell.geometry.area for cell in cells)
+    assert area == pytest.approx(box(75.05, 26.85, 75.15, 26.95).area, rel=1e-6)
+
+
+def test_overlapping_regions_reuse_cached_cells(fetched):
+    store = ResultStore()
+    first, second = region(26.9, 75.1), region(26.92, 75.13)
+    TiledProcessor(FakeFetcher(first), store=store).get_time_series()
+    TiledProcessor(FakeFetcher(second), store=store).get_time_series()
+
+    shared = {c.key for c in cover_region(first) if c.full} & {c.key for c in cover_region(second) if c.full}
+    assert shared
+    refetched = {cell.key for cell in fetched[1]}
+    assert not shared & refetched
+    # Only the part of the second region outside the first, plus its edges, goes to Earth Engine
+    second_area = sum(cell.geometry.area for cell in cover_region(second))
+    assert sum(cell.geometry.area for cell in fetched[1]) < 0.7 * second_area
+
+
+def test_whole_tile_is_composed_from_cached_children(fetched):
+    store = ResultStore()
+    parent = next(cell for cell in cover_region(region(26.9, 75.1)) if cell.full and len(cell.quadkey) == 14)
+    west, south, east, north = parent.geometry.bounds
+    child = parent.children()[0]
+    cw, cs, ce, cn = child.geometry.bounds
+    inner = {'name': 'child', 'coordinates': {'north': cn, 'south': cs, 'east': ce, 'west': cw}}
+    outer = {'name': 'parent', 'coordinates': {'north': north, 'south': south, 'east': east, 'west': west}}
+
+    TiledProcessor(FakeFetcher(inner), store=store).get_time_series()
+    series = TiledProcessor(FakeFetcher(outer), store=store).get_time_series()
+
+    assert [cell.key for cell in fetched[0]] == [child.key]
+    assert sorted(cell.key for cell in fetched[1]) == sorted(c.key for c in parent.children()[1:])
+    assert series.pixel_count[0] == pytest.approx(parent.geometry.area * 1e9, rel=1e-3)
+    # The composed parent is cached for the next region that covers it
+    fetched.clear()
+    TiledProcessor(FakeFetcher(outer), store=store).get_time_series()
+    assert fetched == []
+
+
+def test_merge_cell_frames_pools_mean_and_std():
+    frames = [
+        pd.DataFrame({'date': pd.to_datetime(['2024-01-05']), 'count': [100.0], 'cloud_cover': [5.0],
+                      'NDVI_mean': [0.2], 'NDVI_stdDev': [0.0]}),
+        pd.DataFrame({'date': pd.to_datetime(['2024-01-05']), 'count': [300.0], 'cloud_cover': [9.0],
+                      'NDVI_mean': [0.6], 'NDVI_stdDev': [0.0]})
+    ]
+    merged = merge_cell_frames(frames, ['NDVI'])
+    assert merged['count'].tolist() == [400.0]
+    assert merged['NDVI_mean'].tolist() == pytest.approx([0.5])
+    assert merged['NDVI_stdDev'].tolist() == pytest.approx([(0.75 * 0.25 * 0.16) ** 0.5])
+    assert merged['cloud_cover'].tolist() == [9.0]
+
+
+def test_fetch_cells_batches_by_date_window_and_feature_budget(monkeypatch):
+    scenes = [1500, 0, 900]
+    monkeypatch.setattr(tiling.ee, 'List', list)
+    monkeypatch.setattr(tiling, 'get_info', lambda value, name: scenes)
+    monkeypatch.setattr(tiling, 'split_date_range',
+                        lambda start, end: [('2024-01-01', '2024-03-01'), ('2024-03-01', '2024-05-01'),
+                                            ('2024-05-01', '2024-07-01')])
+    requests = []
+
+    def fetch_batch(self, start_date, end_date, cells, indices):
+        requests.append((start_date, len(cells)))
+        return [{'cell': cell.key, 'date': start_date, 'mean': 0.5, 'stdDev': 0.1, 'count': 10,
+                 'cloud_cover': 1.0} for cell in cells]
+
+    monkeypatch.setattr(TiledProcessor, '_fetch_batch', fetch_batch)
+    aoi = region(26.9, 75.1, half=0.25)
+    cells = cover_region(aoi)
+    processor = TiledProcessor(FakeFetcher(aoi), store=ResultStore())
+    frames = processor._fetch_cells(cells, '2024-01-01', '2024-07-01', ['NDVI'])
+
+    by_window = {}
+    for start, size in requests:
+        assert size * dict(zip(['2024-01-01', '2024-03-01', '2024-05-01'], scenes))[start] <= MAX_FEATURES_PER_REQUEST
+        by_window[start] = by_window.get(start, 0) + size
+    assert by_window == {'2024-01-01': len(cells), '2024-05-01': len(cells)}
+    assert all(len(frames[cell.key]) == 2 for cell in cells)
+    assert frames[cells[0].key]['NDVI_mean'].tolist() == [0.5, 0.5]